@@ -176,5 +176,80 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
 }
 
+# Serve product reads from the denormalized products.ProductCatalogEntry table.
+# Run `manage.py rebuild_product_catalog` once before turning this on.
+PRODUCT_CATALOG_READS = env.bool("PRODUCT_CATALOG_READS", default=False)
+
+# Upper edges of the price facet buckets on the product listing; the last
+# bucket is open-ended.
+PRODUCT_PRICE_BUCKETS = [25, 50, 100, 200]
+
+# How many frequently-bought-together products are kept per product.
+RELATED_PRODUCTS_TOP_K = 10
+
+# /api/products/top/ ranks units sold over the last LEADERBOARD_TOP_DAYS days;
+# /api/products/trending/ ranks add-to-cart events over the last
+# LEADERBOARD_TRENDING_DAYS days, halving a day's weight every half-life.
+# Each worker keeps the top LEADERBOARD_SIZE in memory, recomputed at most
+# every LEADERBOARD_REFRESH_SECONDS.
+LEADERBOARD_SIZE = 100
+LEADERBOARD_REFRESH_SECONDS = env.int("LEADERBOARD_REFRESH_SECONDS", default=60)
+LEADERBOARD_TOP_DAYS = 30
+LEADERBOARD_TRENDING_DAYS = 14
+LEADERBOARD_TRENDING_HALF_LIFE_DAYS = 3
+
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
+
+CACHES = {"default": env.cache("CACHE_URL", default="locmemcache://")}
+
+# Where carts are kept between checkouts: "database" writes every change to
+# ShoppingSession/CartItem; "cache" keeps them in CACHES and writes changed
+# carts behind in batches every CART_FLUSH_INTERVAL seconds (see cart.store)
+# and needs CACHE_URL to be a shared cache such as Redis.
+CART_STORE = env("CART_STORE", default="database")
+CART_FLUSH_INTERVAL = env.float("CART_FLUSH_INTERVAL", default=2)
+CART_FLUSH_BATCH_SIZE = 500
+CART_CACHE_TIMEOUT = 7 * 24 * 60 * 60
+CART_LOCK_TIMEOUT = 5  # Seconds a request waits for a busy cart
+CART_BATCH_MAX_OPERATIONS = 500
+# sweep_abandoned_carts returns the stock of carts idle this long.
+CART_ABANDONED_AFTER_HOURS = env.float("CART_ABANDONED_AFTER_HOURS", default=48)
+
+# Where utils.upload_files stores images: "cloudinary", "local" (files under
+# UPLOAD_LOCAL_ROOT served from MEDIA_URL) or a dotted path to a backend class.
+UPLOAD_BACKEND = env("UPLOAD_BACKEND", default="cloudinary")
+UPLOAD_LOCAL_ROOT = env("UPLOAD_LOCAL_ROOT", default=MEDIA_ROOT)
+UPLOAD_MAX_WORKERS = env.int("UPLOAD_MAX_WORKERS", default=8)
+UPLOAD_TIMEOUT = env.float("UPLOAD_TIMEOUT", default=30)  # Seconds per attempt
+UPLOAD_RETRIES = env.int("UPLOAD_RETRIES", default=2)
+
+# Renditions utils.derivatives generates for product and post images, in a
+# background pool of IMAGE_DERIVATIVE_WORKERS threads. Clients pick one with
+# ?size=<name>.
+IMAGE_DERIVATIVES = {
+    "thumb": {"size": (200, 200), "format": "JPEG"},
+    "medium": {"size": (800, 800), "format": "JPEG"},
+    "webp": {"size": (800, 800), "format": "WEBP"},
+}
+IMAGE_DERIVATIVE_WORKERS = env.int("IMAGE_DERIVATIVE_WORKERS", default=2)
+
+# Point at a stripe-mock server (e.g. http://localhost:12111) to exercise
+# checkout without the real API. Checkout creates missing Stripe prices
+# with up to STRIPE_MAX_WORKERS concurrent calls.
+STRIPE_API_BASE = env("STRIPE_API_BASE", default="https://api.stripe.com")
+STRIPE_MAX_WORKERS = 8
+
+# Webhook events wait in the orders WebhookEvent inbox for process_webhooks.
+# A failing event is retried after WEBHOOK_RETRY_DELAY seconds, doubling
+# each time, and marked dead after WEBHOOK_MAX_ATTEMPTS.
+WEBHOOK_BATCH_SIZE = 100
+WEBHOOK_MAX_ATTEMPTS = 8
+WEBHOOK_RETRY_DELAY = 30
+
+# Rows fetched per server-side cursor round trip by the order exports
+EXPORT_CHUNK_SIZE = 2000
+
+CLOUDINARY_CLOUD_NAME = env("CLOUDINARY_CLOUD_NAME", default="")
+CLOUDINARY_API_KEY = env("CLOUDINARY_API_KEY", default="")
+CLOUDINARY_API_SECRET = env("CLOUDINARY_API_SECRET", default="")
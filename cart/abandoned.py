@@ -0,0 +1,69 @@
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q, Sum
+from django.utils import timezone
+
+from cart.models import CartItem, ShoppingSession
+from cart.store import get_store
+from products import ledger, stock
+
+
+def sweep(idle_for, batch_size=500, stdout=None):
+    """
+    Empty every cart untouched for `idle_for` and put its units back in
+    stock; returns {"sessions", "lines", "units"} released.
+
+    Sessions are walked oldest first along the updated_at index,
+    `batch_size` per transaction so no lock is held for long. Each batch
+    costs a fixed number of statements: the lines are summed per product
+    and the stock comes back with one grouped UPDATE.
+    """
+    store = get_store()
+    cutoff = timezone.now() - idle_for
+    released = {"sessions": 0, "lines": 0, "units": 0}
+    idle = (
+        ShoppingSession.objects.filter(updated_at__lt=cutoff)
+        .filter(Exists(CartItem.objects.filter(session=OuterRef("pk"))))
+        .order_by("updated_at", "pk")
+    )
+    last = None
+    while True:
+        batch = idle
+        if last is not None:
+            batch = batch.filter(
+                Q(updated_at__gt=last[0]) | Q(updated_at=last[0], pk__gt=last[1])
+            )
+        batch = list(batch.values_list("updated_at", "pk", "user_id")[:batch_size])
+        if not batch:
+            return released
+        last = batch[-1][:2]
+
+        user_ids = [user_id for _, _, user_id in batch]
+        with store.evicting(user_ids) as held, transaction.atomic():
+            # Checked again under the lock: a cart used since it was picked
+            # is no longer idle.
+            session_ids = list(
+                ShoppingSession.objects.select_for_update(skip_locked=True)
+                .filter(user_id__in=held, updated_at__lt=cutoff)
+                .values_list("pk", flat=True)
+            )
+            lines = CartItem.objects.filter(session_id__in=session_ids)
+            units = dict(
+                lines.values("product_id")
+                .annotate(units=Sum("quantity"))
+                .order_by()
+                .values_list("product_id", "units")
+            )
+            deleted, _ = lines.delete()
+            ShoppingSession.objects.filter(pk__in=session_ids).update(total=0)
+            stock.adjust_many(
+                units, reason=ledger.Reason.CART_RELEASE, reference="abandoned-cart"
+            )
+
+        released["sessions"] += len(session_ids)
+        released["lines"] += deleted
+        released["units"] += sum(units.values())
+        if stdout is not None:
+            stdout.write(
+                f"Released {released['units']} units from "
+                f"{released['sessions']} carts"
+            )
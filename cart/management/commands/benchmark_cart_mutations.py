@@ -0,0 +1,81 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import CustomUser
+from cart.store import get_store
+from products import stock
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Time adding to a cart as it grows, through the configured CART_STORE. "
+        "Creates a throwaway user and products in the configured database and "
+        "deletes them afterwards; never run against production."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default="1,100,500",
+            help="Comma-separated cart sizes (lines) to measure at.",
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=50, help="Mutations timed per size."
+        )
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options["sizes"].split(","))
+        user = CustomUser.objects.create_user(
+            email="cart-benchmark@example.invalid", password=None
+        )
+        products = Product.objects.bulk_create(
+            [
+                Product(
+                    product_name=f"Cart benchmark {index}",
+                    product_description="Temporary product created by a benchmark.",
+                    product_price=1,
+                )
+                for index in range(sizes[-1] + 1)
+            ]
+        )
+        stock.adjust_many(
+            {product.pk: options["repeat"] * len(sizes) + 1 for product in products}
+        )
+
+        try:
+            self.run(user, products, sizes, options["repeat"])
+        finally:
+            get_store().flush(user)
+            user.delete()
+            Product.objects.filter(pk__in=[product.pk for product in products]).delete()
+
+    def run(self, user, products, sizes, repeat):
+        store = get_store()
+        # The last product is the one added over and over at each size.
+        target, filler = products[-1], products[:-1]
+        in_cart = 0
+        for size in sizes:
+            for product in filler[in_cart:size]:
+                self.add(store, user, product)
+            in_cart = size
+
+            connection.queries_log.clear()
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                for _ in range(repeat):
+                    self.add(store, user, target)
+                elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{size} lines: {elapsed / repeat * 1000:.2f} ms and "
+                f"{len(queries) / repeat:.1f} queries per add"
+            )
+
+    def add(self, store, user, product):
+        # What AddToCartView does, minus HTTP.
+        with store.open(user) as cart:
+            stock.reserve(product.pk, 1, reference=f"cart:{cart.session_id}")
+            cart.set(product, cart.quantity(product.pk) + 1)
@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from cart import abandoned
+
+
+class Command(BaseCommand):
+    help = (
+        "Empty carts nobody has touched for a while and return their reserved "
+        "units to stock. Meant to run on a schedule."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--idle-hours",
+            type=float,
+            default=settings.CART_ABANDONED_AFTER_HOURS,
+            help="Carts unchanged for this long are abandoned.",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        released = abandoned.sweep(
+            timedelta(hours=options["idle_hours"]),
+            batch_size=options["batch_size"],
+            stdout=self.stdout,
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Emptied {released['sessions']} carts: {released['lines']} "
+                f"lines, {released['units']} units back in stock."
+            )
+        )
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from cart import totals
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare every shopping session's total with its lines at current "
+        "prices and correct the ones that drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report drifted sessions, failing if there are any.",
+        )
+
+    def handle(self, *args, **options):
+        if not options["check"]:
+            total = totals.repair()
+            self.stdout.write(self.style.SUCCESS(f"Corrected {total} sessions."))
+            return
+
+        drifted = totals.differences()
+        for session, expected in drifted:
+            self.stdout.write(
+                f"Session {session.pk}: stored {session.total}, expected {expected}"
+            )
+        if drifted:
+            raise CommandError(f"{len(drifted)} sessions drifted.")
+        self.stdout.write(self.style.SUCCESS("All cart totals match."))
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:21
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def swap_timestamps(apps, schema_editor):
+    # The two columns were declared the wrong way round: created_at held
+    # the last change and updated_at the creation time.
+    for name in ("ShoppingSession", "CartItem"):
+        apps.get_model("cart", name).objects.update(
+            created_at=F("updated_at"), updated_at=F("created_at")
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cart", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="cartitem",
+            name="created_at",
+            field=models.DateTimeField(auto_now_add=True),
+        ),
+        migrations.AlterField(
+            model_name="cartitem",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name="shoppingsession",
+            name="created_at",
+            field=models.DateTimeField(auto_now_add=True),
+        ),
+        migrations.AlterField(
+            model_name="shoppingsession",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(swap_timestamps, swap_timestamps),
+        migrations.AddIndex(
+            model_name="shoppingsession",
+            index=models.Index(
+                fields=["updated_at"], name="shopping_session_updated_idx"
+            ),
+        ),
+    ]
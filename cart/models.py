@@ -7,8 +7,14 @@ from products.models import Product
 class ShoppingSession(models.Model):
     user = models.OneToOneField(CustomUser, on_delete=models.CASCADE)
     total = models.IntegerField(blank=True, default=0)
-    created_at = models.DateTimeField(auto_now=True)
-    updated_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # sweep_abandoned_carts finds idle sessions by their last change.
+        indexes = [
+            models.Index(fields=["updated_at"], name="shopping_session_updated_idx")
+        ]
 
 
 class CartItem(models.Model):
@@ -19,5 +25,5 @@ class CartItem(models.Model):
         Product, on_delete=models.CASCADE, related_name="cart_items"
     )
     quantity = models.IntegerField()
-    created_at = models.DateTimeField(auto_now=True)
-    updated_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
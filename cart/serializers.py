@@ -1,3 +1,4 @@
+from django.conf import settings
 from rest_framework import serializers
 
 from products.models import Product
@@ -18,6 +19,50 @@ class AddToCartSerializer(serializers.ModelSerializer):
         fields = ["product", "quantity"]
         read_only_fields = ["id", "created_at", "updated_at"]
 
+    def validate_quantity(self, value):
+        # A zero or negative quantity would put stock back instead of
+        # reserving it; removing a line goes through RemoveCartItem.
+        if value < 1:
+            raise serializers.ValidationError("Quantity must be at least 1.")
+        return value
+
+
+class CartOperationSerializer(serializers.Serializer):
+    ADD, UPDATE, REMOVE = "add", "update", "remove"
+
+    op = serializers.ChoiceField(choices=[ADD, UPDATE, REMOVE])
+    product = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1, required=False)
+
+    def validate(self, attrs):
+        if attrs["op"] != self.REMOVE and "quantity" not in attrs:
+            raise serializers.ValidationError(
+                {"quantity": f"Required for {attrs['op']}."}
+            )
+        return attrs
+
+
+class CartBatchSerializer(serializers.Serializer):
+    operations = serializers.ListField(
+        child=CartOperationSerializer(),
+        allow_empty=False,
+        max_length=settings.CART_BATCH_MAX_OPERATIONS,
+    )
+
+    def validate_operations(self, operations):
+        # One query for every product the batch mentions.
+        products = Product.objects.in_bulk({op["product"] for op in operations})
+        errors = {
+            index: {"product": "Product not found."}
+            for index, op in enumerate(operations)
+            if op["product"] not in products
+        }
+        if errors:
+            raise serializers.ValidationError(errors)
+        for op in operations:
+            op["product"] = products[op["product"]]
+        return operations
+
 
 class CartItemSerializer(serializers.ModelSerializer):
     product = GetProductSerializer()
@@ -0,0 +1,496 @@
+import atexit
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from functools import cache as memoize
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from cart.models import CartItem, ShoppingSession
+from utils import caching
+
+logger = logging.getLogger(__name__)
+
+# Deletes the lock only while it still holds the releasing holder's token.
+RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class CartLocked(Exception):
+    pass
+
+
+class DatabaseStore:
+    """Every change goes straight to ShoppingSession and CartItem."""
+
+    @contextmanager
+    def open(self, user):
+        """
+        The user's cart, locked for the block. Changes made through it and
+        any queries run in the block commit together.
+        """
+        with transaction.atomic():
+            # The session row lock serializes changes to one user's cart.
+            session, _ = ShoppingSession.objects.select_for_update().get_or_create(
+                user=user
+            )
+            yield DatabaseCart(session)
+
+    def flush(self, user):
+        pass
+
+    @contextmanager
+    def checkout(self, user):
+        """Keep the user's cart locked for the block."""
+        with transaction.atomic():
+            ShoppingSession.objects.select_for_update().filter(user=user).first()
+            yield
+
+    @contextmanager
+    def evicting(self, user_ids):
+        # Session row locks taken in the block keep carts from changing.
+        yield list(user_ids)
+
+
+class DatabaseCart:
+    def __init__(self, session):
+        self.session = session
+        self.session_id = session.pk
+        self._items = {}
+
+    @property
+    def total(self):
+        return self.session.total
+
+    def quantity(self, product_id):
+        self.prefetch([product_id])
+        item = self._items[product_id]
+        return item.quantity if item else 0
+
+    def lines(self):
+        """{product_id: quantity} for every line in the cart."""
+        return dict(
+            CartItem.objects.filter(session=self.session).values_list(
+                "product_id", "quantity"
+            )
+        )
+
+    def prefetch(self, product_ids):
+        """Load the lines of `product_ids` with one query."""
+        missing = [pk for pk in product_ids if pk not in self._items]
+        if not missing:
+            return
+        found = {
+            item.product_id: item
+            for item in CartItem.objects.filter(
+                session=self.session, product_id__in=missing
+            )
+        }
+        for product_id in missing:
+            self._items[product_id] = found.get(product_id)
+
+    def set(self, product, quantity):
+        """Set the product's line to `quantity`, dropping it at zero."""
+        return self.set_many({product: quantity})[product.pk]
+
+    def set_many(self, quantities):
+        """
+        Apply {product: quantity} with one statement per kind of change and
+        one for the total; returns {product_id: CartItem}.
+        """
+        self.prefetch([product.pk for product in quantities])
+        removed, changed, added = [], [], []
+        delta = 0
+        result = {}
+        now = timezone.now()
+        for product, quantity in quantities.items():
+            quantity = max(quantity, 0)
+            item = self._items[product.pk]
+            delta += (quantity - (item.quantity if item else 0)) * product.product_price
+            if not quantity:
+                if item is not None:
+                    removed.append(item.pk)
+                self._items[product.pk] = None
+                item = CartItem(session=self.session, product=product, quantity=0)
+            elif item is None:
+                item = CartItem(
+                    session=self.session, product=product, quantity=quantity
+                )
+                self._items[product.pk] = item
+                added.append(item)
+            else:
+                item.quantity = quantity
+                item.updated_at = now
+                changed.append(item)
+            result[product.pk] = item
+
+        if removed:
+            CartItem.objects.filter(pk__in=removed).delete()
+        if changed:
+            CartItem.objects.bulk_update(changed, ["quantity", "updated_at"])
+        if added:
+            CartItem.objects.bulk_create(added)
+
+        # The total moves by the changed lines alone; verify_cart_totals
+        # repairs totals that drift when prices change.
+        ShoppingSession.objects.filter(pk=self.session_id).update(
+            total=F("total") + delta, updated_at=now
+        )
+        self.session.total += delta
+        return result
+
+
+class WriteBehindStore:
+    """
+    Carts live in the Django cache and reach the database in batches.
+
+    A mutation costs a few cache round trips however many lines the cart
+    has; a background thread in each process writes changed carts to
+    ShoppingSession and CartItem every CART_FLUSH_INTERVAL seconds, up to
+    CART_FLUSH_BATCH_SIZE carts per transaction. Anything that reads carts
+    from the database (listing, checkout, the payment webhook) calls
+    flush() or checkout() first, so it never sees a stale cart.
+
+    Carts that haven't been written yet live only in the cache, and their
+    stock is already reserved in the database, so CACHE_URL must point at
+    a shared cache that doesn't cull entries (e.g. Redis); anything else
+    raises ImproperlyConfigured.
+    """
+
+    KEY = "cart:{user_id}"
+    LOCK_KEY = "cart:lock:{user_id}"
+
+    def __init__(self):
+        if not caching.is_shared():
+            raise ImproperlyConfigured(
+                f'CART_STORE="cache" needs a shared cache, not '
+                f"{caching.cache_backend()}: cart "
+                "locks would be per process and unwritten carts could be culled "
+                "while their stock stays reserved. Set CACHE_URL to Redis or "
+                "memcached."
+            )
+        self.pending = set()
+        self.pending_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+        atexit.register(self.flush_pending)
+
+    @contextmanager
+    def open(self, user):
+        with self._locked(user.pk):
+            cart = CachedCart(self._load(user))
+            with transaction.atomic():
+                yield cart
+            # Only carts whose stock changes committed are stored.
+            if cart.changed:
+                cart.state["dirty"] = True
+                self._store(user.pk, cart.state)
+                self._schedule(user.pk)
+
+    def flush(self, user):
+        """Write the user's cart to the database now."""
+        with self._locked(user.pk):
+            self._write([user.pk])
+
+    @contextmanager
+    def checkout(self, user):
+        """
+        Flush the user's cart and keep it locked for the block, which may
+        change it in the database; the cart is reloaded from there after.
+        """
+        with self._locked(user.pk):
+            self._write([user.pk])
+            yield
+            transaction.on_commit(lambda: cache.delete(self._key(user.pk)))
+
+    @contextmanager
+    def evicting(self, user_ids):
+        """
+        Lock the carts of `user_ids` for the block, which changes them in
+        the database, and drop their cached copies after. Pending changes
+        are written first; carts busy in a request are left out of the ids
+        yielded.
+        """
+        tokens = {}
+        try:
+            for user_id in user_ids:
+                token = self._acquire(user_id, timeout=0)
+                if token is not None:
+                    tokens[user_id] = token
+            held = list(tokens)
+            self._write(held)
+            yield held
+            cache.delete_many([self._key(user_id) for user_id in held])
+        finally:
+            for user_id, token in tokens.items():
+                self._release(user_id, token)
+
+    def flush_pending(self):
+        """Write every cart this process changed, batch by batch."""
+        with self.pending_lock:
+            user_ids, self.pending = list(self.pending), set()
+        retry = set()
+        batch_size = settings.CART_FLUSH_BATCH_SIZE
+        for start in range(0, len(user_ids), batch_size):
+            retry |= self._flush_batch(user_ids[start : start + batch_size])
+        if retry:
+            # Carts busy in a request now; they'll go with the next round.
+            with self.pending_lock:
+                self.pending |= retry
+
+    def _flush_batch(self, user_ids):
+        tokens = {}
+        try:
+            for user_id in user_ids:
+                token = self._acquire(user_id, timeout=0)
+                if token is not None:
+                    tokens[user_id] = token
+            self._write(list(tokens))
+        finally:
+            for user_id, token in tokens.items():
+                self._release(user_id, token)
+        return set(user_ids) - set(tokens)
+
+    def _write(self, user_ids):
+        """Store the dirty carts of `user_ids`; their locks must be held."""
+        keys = {self._key(user_id): user_id for user_id in user_ids}
+        states = {
+            keys[key]: state
+            for key, state in cache.get_many(keys).items()
+            if state["dirty"]
+        }
+        if not states:
+            return
+
+        with transaction.atomic():
+            ShoppingSession.objects.bulk_update(
+                [
+                    ShoppingSession(
+                        pk=state["session_id"],
+                        total=state["total"],
+                        updated_at=state["updated_at"],
+                    )
+                    for state in states.values()
+                ],
+                ["total", "updated_at"],
+            )
+            kept, changed, added = [], [], []
+            for state in states.values():
+                for product_id, line in state["lines"].items():
+                    item = CartItem(
+                        pk=line["id"],
+                        session_id=state["session_id"],
+                        product_id=product_id,
+                        quantity=line["quantity"],
+                        updated_at=line["updated_at"],
+                    )
+                    if line["id"] is None:
+                        added.append((line, item))
+                    else:
+                        kept.append(line["id"])
+                        changed.append(item)
+            CartItem.objects.filter(
+                session_id__in=[state["session_id"] for state in states.values()]
+            ).exclude(pk__in=kept).delete()
+            CartItem.objects.bulk_update(
+                changed, ["quantity", "updated_at"], batch_size=1000
+            )
+            CartItem.objects.bulk_create([item for _, item in added], batch_size=1000)
+
+        for line, item in added:
+            line["id"] = item.pk
+        for state in states.values():
+            state["dirty"] = False
+        cache.set_many(
+            {self._key(user_id): state for user_id, state in states.items()},
+            timeout=settings.CART_CACHE_TIMEOUT,
+        )
+
+    def _load(self, user):
+        state = cache.get(self._key(user.pk))
+        if state is not None:
+            return state
+
+        session, _ = ShoppingSession.objects.get_or_create(user=user)
+        lines = {
+            product_id: {
+                "id": pk,
+                "quantity": quantity,
+                "price": price,
+                "updated_at": updated_at,
+            }
+            for pk, product_id, quantity, price, updated_at in CartItem.objects.filter(
+                session=session
+            ).values_list(
+                "pk", "product_id", "quantity", "product__product_price", "updated_at"
+            )
+        }
+        return {
+            "session_id": session.pk,
+            "updated_at": session.updated_at,
+            "total": sum(line["quantity"] * line["price"] for line in lines.values()),
+            "lines": lines,
+            "dirty": False,
+        }
+
+    def _store(self, user_id, state):
+        cache.set(self._key(user_id), state, timeout=settings.CART_CACHE_TIMEOUT)
+
+    def _schedule(self, user_id):
+        with self.pending_lock:
+            self.pending.add(user_id)
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self._run, name="cart-flush", daemon=True
+                )
+                self.thread.start()
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(settings.CART_FLUSH_INTERVAL)
+            try:
+                self.flush_pending()
+            except Exception:
+                logger.exception("Could not write carts to the database")
+            finally:
+                # This thread outlives the request cycle that would close it.
+                connection.close()
+
+    @contextmanager
+    def _locked(self, user_id):
+        token = self._acquire(user_id, timeout=settings.CART_LOCK_TIMEOUT)
+        if token is None:
+            raise CartLocked(f"Cart of user {user_id} is busy.")
+        try:
+            yield
+        finally:
+            self._release(user_id, token)
+
+    def _acquire(self, user_id, timeout):
+        # The lock expires on its own should its holder die. The token is an
+        # int so Redis stores it as plain digits the release script can match.
+        token = uuid.uuid4().int
+        deadline = time.monotonic() + timeout
+        while not cache.add(
+            self.LOCK_KEY.format(user_id=user_id),
+            token,
+            timeout=settings.CART_LOCK_TIMEOUT * 2,
+        ):
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(0.005)
+        return token
+
+    def _release(self, user_id, token):
+        """
+        Drop the lock if it is still ours: a holder that overran the lock
+        timeout must not delete a lock another request has taken since.
+        """
+        key = self.LOCK_KEY.format(user_id=user_id)
+        backend = caches[DEFAULT_CACHE_ALIAS]
+        client = self._redis_client(backend)
+        if client is not None:
+            client.eval(RELEASE_SCRIPT, 1, backend.make_and_validate_key(key), token)
+        elif cache.get(key) == token:
+            # No compare-and-delete here; the lock can only change hands in
+            # between if it expires right at this moment.
+            cache.delete(key)
+
+    @staticmethod
+    def _redis_client(backend):
+        if hasattr(backend, "_cache") and hasattr(backend._cache, "get_client"):
+            return backend._cache.get_client(write=True)  # Django's RedisCache
+        client = getattr(backend, "client", None)
+        if client is not None and hasattr(client, "get_client"):
+            return client.get_client(write=True)  # django-redis
+        return None
+
+    def _key(self, user_id):
+        return self.KEY.format(user_id=user_id)
+
+
+class CachedCart:
+    def __init__(self, state):
+        self.state = state
+        self.session_id = state["session_id"]
+        self.changed = False
+
+    @property
+    def total(self):
+        return self.state["total"]
+
+    def quantity(self, product_id):
+        line = self.state["lines"].get(product_id)
+        return line["quantity"] if line else 0
+
+    def lines(self):
+        """{product_id: quantity} for every line in the cart."""
+        return {
+            product_id: line["quantity"]
+            for product_id, line in self.state["lines"].items()
+        }
+
+    def prefetch(self, product_ids):
+        pass
+
+    def set(self, product, quantity):
+        """Set the product's line to `quantity`, dropping it at zero."""
+        lines = self.state["lines"]
+        line = lines.get(product.pk)
+        old = line["quantity"] if line else 0
+        now = timezone.now()
+        if quantity <= 0:
+            lines.pop(product.pk, None)
+        elif line is None:
+            lines[product.pk] = {
+                "id": None,
+                "quantity": quantity,
+                "price": product.product_price,
+                "updated_at": now,
+            }
+        else:
+            line["quantity"] = quantity
+            line["updated_at"] = now
+        self.state["updated_at"] = now
+        price = line["price"] if line else product.product_price
+        self.state["total"] += (max(quantity, 0) - old) * price
+        self.changed = True
+        return CartItem(
+            pk=line["id"] if line else None,
+            session_id=self.session_id,
+            product=product,
+            quantity=max(quantity, 0),
+        )
+
+    def set_many(self, quantities):
+        """Apply {product: quantity}; returns {product_id: CartItem}."""
+        return {
+            product.pk: self.set(product, quantity)
+            for product, quantity in quantities.items()
+        }
+
+
+STORES = {
+    "database": DatabaseStore,
+    "cache": WriteBehindStore,
+}
+
+
+@memoize
+def get_store(name=None):
+    """CART_STORE is "database", "cache" or a dotted path to a class."""
+    name = name or settings.CART_STORE
+    store_class = STORES.get(name) or import_string(name)
+    return store_class()
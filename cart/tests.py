@@ -1,3 +1,34 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase
+
+from cart.store import WriteBehindStore
+
+LOCMEM = "django.core.cache.backends.locmem.LocMemCache"
+
+
+class WriteBehindStoreTests(SimpleTestCase):
+    def tearDown(self):
+        cache.clear()
+
+    def test_needs_shared_cache(self):
+        with self.assertRaises(ImproperlyConfigured):
+            WriteBehindStore()
+
+    @mock.patch("utils.caching.SHARED_CACHE_BACKENDS", (LOCMEM,))
+    def test_release_keeps_lock_taken_by_another_holder(self):
+        store = WriteBehindStore()
+        key = store.LOCK_KEY.format(user_id=1)
+        stale = store._acquire(1, timeout=0)
+        # The lock expired and another request took it.
+        cache.delete(key)
+        current = store._acquire(1, timeout=0)
+
+        store._release(1, stale)
+        self.assertEqual(cache.get(key), current)
+        self.assertIsNone(store._acquire(1, timeout=0))
+
+        store._release(1, current)
+        self.assertIsNone(cache.get(key))
@@ -0,0 +1,44 @@
+from django.db.models import F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from cart.models import CartItem, ShoppingSession
+from cart.store import get_store
+
+
+def _expected_total():
+    lines = (
+        CartItem.objects.filter(session=OuterRef("pk"))
+        .values("session")
+        .annotate(total=Sum(F("quantity") * F("product__product_price")))
+        .values("total")
+    )
+    return Coalesce(Subquery(lines), Value(0), output_field=IntegerField())
+
+
+def differences(sessions=None):
+    """
+    [(session, expected total)] for every session whose stored total
+    doesn't match its lines at today's prices, found in one query.
+    """
+    sessions = sessions if sessions is not None else ShoppingSession.objects.all()
+    drifted = (
+        sessions.annotate(expected=_expected_total())
+        .exclude(total=F("expected"))
+        .select_related("user")
+        .order_by("pk")
+    )
+    return [(session, session.expected) for session in drifted]
+
+
+def repair(sessions=None):
+    """Recompute every drifted total; returns how many were wrong."""
+    store = get_store()
+    drifted = differences(sessions)
+    for session, _ in drifted:
+        # Under the store's checkout lock no cart change lands between the
+        # recount and the write.
+        with store.checkout(session.user):
+            ShoppingSession.objects.filter(pk=session.pk).update(
+                total=_expected_total()
+            )
+    return len(drifted)
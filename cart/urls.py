@@ -1,10 +1,13 @@
 from django.urls import path
 
 from .views import (  # CreateOrder,; GetAllOrders,; UpdateOrderStatus,
-    AddToCartView, RemoveCartItem, UpdateCartItemView, UserCartItemsView)
+    AddToCartView, CartBatchView, CartView, RemoveCartItem, UpdateCartItemView,
+    UserCartItemsView)
 
 urlpatterns = [
+    path("cart/", CartView.as_view(), name="cart"),
     path("cart/add-item/", AddToCartView.as_view(), name="add-cart-item"),
+    path("cart/batch/", CartBatchView.as_view(), name="cart-batch"),
     path("cart/get-items/", UserCartItemsView.as_view(), name="get-cart-items"),
     path("cart/remove-item/<int:pk>/", RemoveCartItem.as_view(), name="remove-item"),
     path(
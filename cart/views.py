@@ -1,16 +1,21 @@
-from django.db import models
-from django.db.models import F, Sum
+from django.db.models import Count, F, Max, Prefetch, Sum, URLField
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import Coalesce
 from rest_framework import status
 from rest_framework.generics import (CreateAPIView, DestroyAPIView,
-                                     ListAPIView, UpdateAPIView)
+                                     GenericAPIView, ListAPIView,
+                                     UpdateAPIView)
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from products.models import Product, ProductInventory
+from products import leaderboard, ledger, stock
+from products.models import Product
 
 from .models import CartItem, ShoppingSession
-from .serializers import (AddToCartSerializer, CartItemSerializer,
+from .serializers import (AddToCartSerializer, CartBatchSerializer,
+                          CartItemSerializer, CartOperationSerializer,
                           CartSessionSerializer)
+from .store import get_store
 
 
 class AddToCartView(CreateAPIView):
@@ -20,73 +25,33 @@ class AddToCartView(CreateAPIView):
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
-            product_id = serializer.validated_data["product"]
+            product = serializer.validated_data["product"]
             quantity = serializer.validated_data["quantity"]
             user = request.user
 
-            # Ensure the user has a shopping session
-            shopping_session, created = ShoppingSession.objects.get_or_create(user=user)
-
-            # Ensure the product exists
-            try:
-                product = Product.objects.get(pk=product_id.id)
-
-            except Product.DoesNotExist:
-                return Response(
-                    {"detail": "Product not found."}, status=status.HTTP_404_NOT_FOUND
-                )
-
-            # Get the ProductInventory instance and check stock
-            try:
-                product_inventory = ProductInventory.objects.get(product=product.id)
-            except ProductInventory.DoesNotExist:
-                return Response(
-                    {"detail": "Product inventory not found."},
-                    status=status.HTTP_404_NOT_FOUND,
-                )
-
-            # Check if there is enough stock
-            if product_inventory.quantity < quantity:
-                return Response(
-                    {"detail": "Insufficient stock."},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
-            # Update the quantity in inventory
-            product_inventory.quantity -= quantity
-            product_inventory.save()
+            with get_store().open(user) as cart:
+                # Take the units out of stock; no matching row means either
+                # too little stock or no inventory at all.
+                if not stock.reserve(
+                    product.id, quantity, reference=f"cart:{cart.session_id}"
+                ):
+                    return Response(
+                        {"detail": "Insufficient stock."},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
 
-            # Calculate the total cost of the items being added
-            quantity * product.product_price
+                leaderboard.record_cart_add(product.id)
 
-            # Update or create the cart item
-            cart_item, created = CartItem.objects.get_or_create(
-                session=shopping_session,
-                product=product,
-                defaults={"quantity": quantity},
-            )
+                # Update or create the cart item
+                in_cart = cart.quantity(product.id)
+                cart_item = cart.set(product, in_cart + quantity)
 
-            if not created:
-                # If the cart item already exists, update the quantity
-                cart_item.quantity += quantity
-                cart_item.save()
-                status_message = "Cart item updated"
-                status_code = status.HTTP_200_OK
-            else:
-                status_message = "Cart item added"
-                status_code = status.HTTP_201_CREATED
-
-            # Update total in ShoppingSession
-            total_quantity = CartItem.objects.filter(
-                session=shopping_session
-            ).aggregate(
-                total_cost=models.Sum(
-                    models.F("quantity") * models.F("product__product_price")
-                )
-            )
-            total_cost_in_session = total_quantity["total_cost"] or 0
-            shopping_session.total = total_cost_in_session
-            shopping_session.save()
+                if in_cart:
+                    status_message = "Cart item updated"
+                    status_code = status.HTTP_200_OK
+                else:
+                    status_message = "Cart item added"
+                    status_code = status.HTTP_201_CREATED
 
             return Response(
                 {
@@ -102,84 +67,47 @@ class UpdateCartItemView(UpdateAPIView):
     serializer_class = AddToCartSerializer
     permission_classes = [IsAuthenticated]
 
-    def get_queryset(self):
-        # Ensure we filter the cart items by the current user's shopping session
-        user = self.request.user
-        try:
-            shopping_session = ShoppingSession.objects.get(user=user)
-        except ShoppingSession.DoesNotExist:
-            shopping_session = None
-
-        # Return the cart items related to the user's shopping session
-        return CartItem.objects.filter(session=shopping_session)
-
     def patch(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
-            product_id = serializer.validated_data["product"]
+            product = serializer.validated_data["product"]
             new_quantity = serializer.validated_data["quantity"]
             user = request.user
 
-            # Ensure the user has a shopping session
-            try:
-                shopping_session = ShoppingSession.objects.get(user=user)
-            except ShoppingSession.DoesNotExist:
-                return Response(
-                    {"detail": "Shopping session not found."},
-                    status=status.HTTP_404_NOT_FOUND,
-                )
-
-            # Ensure the product exists in the cart
-            try:
-                cart_item = CartItem.objects.get(
-                    session=shopping_session, product=product_id
-                )
-            except CartItem.DoesNotExist:
-                return Response(
-                    {"detail": "Product not found in cart."},
-                    status=status.HTTP_404_NOT_FOUND,
-                )
-
-            # Ensure the product exists and check stock availability
-            try:
-                product_inventory = ProductInventory.objects.get(product=product_id)
-            except ProductInventory.DoesNotExist:
-                return Response(
-                    {"detail": "Product inventory not found."},
-                    status=status.HTTP_404_NOT_FOUND,
-                )
-
-            # Calculate the difference in quantity (to update inventory)
-            quantity_difference = new_quantity - cart_item.quantity
-
-            # Check if the new quantity is within available stock
-            if quantity_difference > 0:  # If increasing quantity
-                if product_inventory.quantity < quantity_difference:
+            # The store locks the cart, so two concurrent updates never work
+            # off the same old quantity.
+            with get_store().open(user) as cart:
+                # Ensure the product exists in the cart
+                old_quantity = cart.quantity(product.id)
+                if not old_quantity:
                     return Response(
-                        {"detail": "Insufficient stock to fulfill the request."},
-                        status=status.HTTP_400_BAD_REQUEST,
+                        {"detail": "Product not found in cart."},
+                        status=status.HTTP_404_NOT_FOUND,
                     )
-                # Update inventory: reduce stock for the new quantity
-                product_inventory.quantity -= quantity_difference
-            else:
-                # Update inventory: restore stock for the reduced quantity
-                product_inventory.quantity += abs(
-                    quantity_difference
-                )  # Correct logic for decreasing quantity
-
-            product_inventory.save()
-
-            # Update the cart item quantity
-            cart_item.quantity = new_quantity
-            cart_item.save()
-
-            # Recalculate the total in the shopping session
-            total_quantity = CartItem.objects.filter(
-                session=shopping_session
-            ).aggregate(total_cost=Sum(F("quantity") * F("product__product_price")))
-            total_cost_in_session = total_quantity["total_cost"] or 0
-            shopping_session.total = total_cost_in_session
-            shopping_session.save()
+
+                # Calculate the difference in quantity (to update inventory)
+                quantity_difference = new_quantity - old_quantity
+
+                if quantity_difference > 0:  # If increasing quantity
+                    if not stock.reserve(
+                        product.id,
+                        quantity_difference,
+                        reference=f"cart:{cart.session_id}",
+                    ):
+                        return Response(
+                            {"detail": "Insufficient stock to fulfill the request."},
+                            status=status.HTTP_400_BAD_REQUEST,
+                        )
+                elif quantity_difference < 0:
+                    # Restore stock for the reduced quantity
+                    stock.release(
+                        product.id,
+                        -quantity_difference,
+                        reference=f"cart:{cart.session_id}",
+                    )
+
+                # Update the cart item quantity
+                cart_item = cart.set(product, new_quantity)
 
             return Response(
                 {
@@ -192,41 +120,125 @@ class UpdateCartItemView(UpdateAPIView):
 
 
 class RemoveCartItem(DestroyAPIView):
-    queryset = CartItem.objects.all()
     permission_classes = [IsAuthenticated]
     lookup_field = "pk"
 
+    def get_queryset(self):
+        # Only the user's own cart lines can be removed
+        return CartItem.objects.filter(session__user=self.request.user)
+
     def delete(self, request, *args, **kwargs):
+        store = get_store()
+        # Lines are addressed by their database id, so pending changes to
+        # the cart have to be written first.
+        store.flush(request.user)
         cart_item = self.get_object()
 
-        product = cart_item.product
-        quantity = cart_item.quantity
+        with store.open(request.user) as cart:
+            quantity = cart.quantity(cart_item.product_id)
+            if not quantity:
+                # Removed by a concurrent request, which released the stock
+                return Response(status=status.HTTP_204_NO_CONTENT)
+
+            cart.set(cart_item.product, 0)
+            stock.release(
+                cart_item.product_id,
+                quantity,
+                reference=f"cart:{cart.session_id}",
+            )
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
-        self.perform_destroy(cart_item)
 
-        try:
-            product_inventory = ProductInventory.objects.get(product=product.id)
-            product_inventory.quantity += quantity
-            product_inventory.save()
-        except ProductInventory.DoesNotExist:
-            return Response(
-                {"detail": "Product inventory not found."},
-                status=status.HTTP_404_NOT_FOUND,
+class CartBatchView(GenericAPIView):
+    """
+    Apply an ordered list of add/update/remove operations, each naming a
+    product, in one transaction and return the resulting cart.
+
+    Stock for every touched product is reserved or released in bulk from
+    the net change per product, so a batch either applies whole or, when
+    any product is short, not at all.
+    """
+
+    serializer_class = CartBatchSerializer
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        operations = serializer.validated_data["operations"]
+
+        with get_store().open(request.user) as cart:
+            products = {op["product"].pk: op["product"] for op in operations}
+            cart.prefetch(products)
+
+            quantities = {}
+            added = {}
+            errors = {}
+            for index, op in enumerate(operations):
+                product_id = op["product"].pk
+                current = quantities.get(product_id, cart.quantity(product_id))
+                if op["op"] == CartOperationSerializer.ADD:
+                    quantities[product_id] = current + op["quantity"]
+                    added[product_id] = added.get(product_id, 0) + 1
+                elif op["op"] == CartOperationSerializer.UPDATE:
+                    if not current:
+                        errors[index] = {"detail": "Product not found in cart."}
+                        continue
+                    quantities[product_id] = op["quantity"]
+                else:
+                    quantities[product_id] = 0
+            if errors:
+                return Response(
+                    {"operations": errors}, status=status.HTTP_400_BAD_REQUEST
+                )
+
+            changes = {
+                product_id: quantity - cart.quantity(product_id)
+                for product_id, quantity in quantities.items()
+            }
+            reference = f"cart:{cart.session_id}"
+            try:
+                stock.adjust_many(
+                    {pid: -change for pid, change in changes.items() if change > 0},
+                    reason=ledger.Reason.CART_RESERVE,
+                    reference=reference,
+                )
+            except stock.InsufficientStock as error:
+                return Response(
+                    {"detail": "Insufficient stock.", "products": error.product_ids},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            stock.adjust_many(
+                {pid: -change for pid, change in changes.items() if change < 0},
+                reason=ledger.Reason.CART_RELEASE,
+                reference=reference,
             )
+            leaderboard.record_cart_adds(added)
 
-        shopping_session = cart_item.session
-        total_quantity = CartItem.objects.filter(session=shopping_session).aggregate(
-            total_cost=models.Sum(
-                models.F("quantity") * models.F("product__product_price")
+            cart.set_many(
+                {
+                    products[product_id]: quantities[product_id]
+                    for product_id, change in changes.items()
+                    if change
+                }
             )
+            lines = cart.lines()
+
+        return Response(
+            {
+                "cart": {
+                    "total": cart.total,
+                    "items": [
+                        {"product": product_id, "quantity": quantity}
+                        for product_id, quantity in lines.items()
+                    ],
+                }
+            },
+            status=status.HTTP_200_OK,
         )
 
-        total_cost_in_session = total_quantity["total_cost"] or 0
-        shopping_session.total = total_cost_in_session
-        shopping_session.save()
-
-        return Response(status=status.HTTP_204_NO_CONTENT)
-
 
 class UserCartItemsView(ListAPIView):
     serializer_class = CartItemSerializer
@@ -234,8 +246,65 @@ class UserCartItemsView(ListAPIView):
 
     def get_queryset(self):
         user = self.request.user
-        try:
-            cart_session = ShoppingSession.objects.get(user=user)
-            return CartItem.objects.filter(session=cart_session)
-        except ShoppingSession.DoesNotExist:
-            return CartItem.objects.none()
+        get_store().flush(user)
+        # One query for the lines and a fixed number for their products,
+        # however many lines the cart has.
+        return CartItem.objects.filter(session__user=user).prefetch_related(
+            Prefetch("product", queryset=Product.objects.for_listing())
+        )
+
+
+class CartView(GenericAPIView):
+    """
+    The user's cart for rendering: each line with only its product's name,
+    price and thumbnail, in two queries. ?summary=1 returns just the item
+    count and total, in one.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        user = request.user
+        get_store().flush(user)
+        lines = CartItem.objects.filter(session__user=user)
+
+        if request.query_params.get("summary") in ("1", "true"):
+            summary = ShoppingSession.objects.filter(user=user).aggregate(
+                total=Max("total"),
+                line_count=Count("cart_items"),
+                item_count=Sum("cart_items__quantity"),
+            )
+            return Response(
+                {
+                    "line_count": summary["line_count"],
+                    "item_count": summary["item_count"] or 0,
+                    "total": summary["total"] or 0,
+                },
+                status=status.HTTP_200_OK,
+            )
+
+        image = "product__product_primary_image__"
+        items = list(
+            lines.order_by("pk").values(
+                "id",
+                "product_id",
+                "quantity",
+                "created_at",
+                "updated_at",
+                product_name=F("product__product_name"),
+                product_price=F("product__product_price"),
+                thumbnail=Coalesce(
+                    KeyTextTransform("thumb", f"{image}derivatives"),
+                    f"{image}image",
+                    output_field=URLField(),
+                ),
+            )
+        )
+        total = (
+            ShoppingSession.objects.filter(user=user)
+            .values_list("total", flat=True)
+            .first()
+        )
+        return Response(
+            {"items": items, "total": total or 0}, status=status.HTTP_200_OK
+        )
@@ -0,0 +1,95 @@
+import hashlib
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max, Q
+
+from category.models import Category
+from products.models import Product, ProductCatalogEntry
+from utils import caching
+
+VERSION_KEY = "category:listing:version"
+LISTING_KEY = "category:listing:{version}"
+LISTING_TIMEOUT = 24 * 60 * 60  # Superseded versions just expire
+
+# (version, listing) this process last built or fetched. Replaced whole,
+# so threads never see a version paired with another version's listing.
+_local = (None, None)
+
+
+def get_listing():
+    """
+    Every category with its product_count and in_stock_count, serialized.
+
+    The shared cache holds a version token and the listing for that token;
+    each process also keeps the listing it last saw. In steady state a
+    request costs one small cache read for the token and no queries.
+
+    A cache that isn't shared (locmem) would only see its own process's
+    bumps, so there the version comes from the database instead: three
+    aggregates over indexed updated_at columns.
+    """
+    return _current()[1]
+
+
+def get_version():
+    """The version of the listing get_listing() returns, for ETags."""
+    return _current()[0]
+
+
+def build_listing():
+    from category.serializers import CategoryCountSerializer
+
+    categories = Category.objects.annotate(
+        product_count=Count("products"),
+        in_stock_count=Count("products", filter=Q(products__inventory__quantity__gt=0)),
+    )
+    return [dict(row) for row in CategoryCountSerializer(categories, many=True).data]
+
+
+def _current():
+    global _local
+
+    version = _shared_version() if caching.is_shared() else _database_version()
+
+    if _local[0] == version:
+        return _local
+
+    key = LISTING_KEY.format(version=version)
+    listing = cache.get(key)
+    if listing is None:
+        listing = build_listing()
+        cache.set(key, listing, timeout=LISTING_TIMEOUT)
+
+    _local = (version, listing)
+    return _local
+
+
+def _shared_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # add() so concurrent first requests agree on one token.
+        cache.add(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def _database_version():
+    # Catalog entries move with product categories and stock; deleted
+    # products and categories show in the counts.
+    stamps = (
+        Category.objects.aggregate(count=Count("pk"), updated=Max("updated_at")),
+        Product.objects.aggregate(count=Count("pk")),
+        ProductCatalogEntry.objects.aggregate(updated=Max("updated_at")),
+    )
+    return hashlib.sha256(repr(stamps).encode("utf-8")).hexdigest()[:32]
+
+
+def invalidate():
+    """Drop the cached listing once the current transaction commits."""
+    transaction.on_commit(_bump_version)
+
+
+def _bump_version():
+    cache.set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
@@ -8,3 +8,4 @@ class Category(models.Model):
 
     class Meta:
         ordering = ["created_at"]
+        indexes = [models.Index(fields=["updated_at"], name="category_updated_at_idx")]
@@ -11,3 +11,8 @@ class CategorySerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         category = Category.objects.create(**validated_data)
         return category
+
+
+class CategoryCountSerializer(CategorySerializer):
+    product_count = serializers.IntegerField(read_only=True)
+    in_stock_count = serializers.IntegerField(read_only=True)
@@ -0,0 +1,33 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from category import counts
+from category.models import Category
+from products.models import Product, ProductInventory
+from products.stock import stock_status_changed
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Product)
+def invalidate_on_change(sender, **kwargs):
+    counts.invalidate()
+
+
+@receiver(m2m_changed, sender=Product.product_categories.through)
+def invalidate_on_categories_change(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        counts.invalidate()
+
+
+@receiver(post_save, sender=ProductInventory)
+@receiver(post_delete, sender=ProductInventory)
+def invalidate_on_inventory_save(sender, **kwargs):
+    # Direct saves (admin, shell) bypass products.stock, so whether the
+    # product crossed zero is unknown.
+    counts.invalidate()
+
+
+@receiver(stock_status_changed)
+def invalidate_on_stock_status_change(sender, product_ids, **kwargs):
+    counts.invalidate()
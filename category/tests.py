@@ -1,3 +1,39 @@
+from unittest import mock
+
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from category import counts
+from category.models import Category
+
+LOCMEM = "django.core.cache.backends.locmem.LocMemCache"
+
+
+class CategoryCountsVersionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_unshared_cache_versions_from_database(self):
+        Category.objects.create(name="a")
+        version = counts.get_version()
+
+        # Written by another process: no bump reaches this one's cache.
+        Category.objects.bulk_create([Category(name="b")])
+
+        self.assertNotEqual(counts.get_version(), version)
+        self.assertEqual(
+            [category["name"] for category in counts.get_listing()], ["a", "b"]
+        )
+
+    @mock.patch("utils.caching.SHARED_CACHE_BACKENDS", (LOCMEM,))
+    def test_shared_cache_versions_from_token(self):
+        Category.objects.create(name="a")
+        version = counts.get_version()
+        with self.assertNumQueries(0):
+            self.assertEqual(counts.get_version(), version)
+            counts.get_listing()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name="b")
+        self.assertNotEqual(counts.get_version(), version)
@@ -1,13 +1,17 @@
+from django.utils.http import quote_etag
 from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
 from utils.common import IsAdminUser
+from utils.conditional import ConditionalGetMixin
 
+from . import counts
 from .models import Category
 from .serializers import CategorySerializer
 
 
-class CategoryList(generics.ListCreateAPIView):
+class CategoryList(ConditionalGetMixin, generics.ListCreateAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
 
@@ -17,6 +21,15 @@ class CategoryList(generics.ListCreateAPIView):
         else:
             return [IsAuthenticated(), IsAdminUser()]
 
+    def get_version(self):
+        # The cached listing's version changes whenever categories, their
+        # products or stock do, so no aggregate queries are needed here.
+        return quote_etag(f"categories-{counts.get_version()}"), None
+
+    def list(self, request, *args, **kwargs):
+        # Categories with product and in-stock counts, from category.counts
+        return Response(counts.get_listing())
+
 
 class CategoryDetails(generics.RetrieveUpdateDestroyAPIView):
     queryset = Category.objects.all()
@@ -0,0 +1,92 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import stripe
+from django.conf import settings
+from django.utils import timezone
+
+from cart.models import CartItem
+from orders.models import StripePrice
+
+CURRENCY = "usd"
+
+
+def load_cart(user):
+    """The user's cart lines with product, stock and Stripe price, in one query."""
+    return list(
+        CartItem.objects.filter(session__user=user)
+        .select_related("product", "product__inventory", "product__stripe_price")
+        .order_by("pk")
+    )
+
+
+def unavailable(lines):
+    """
+    Product ids of lines that can't be bought. Units are taken out of stock
+    when they go in the cart, so a line only needs its product to still be
+    stocked at all and a positive quantity.
+    """
+    return [
+        line.product_id
+        for line in lines
+        if line.quantity < 1 or not hasattr(line.product, "inventory")
+    ]
+
+
+def unit_amount(product):
+    return product.product_price * 100
+
+
+def price_ids(products):
+    """
+    {product_id: Stripe Price id} for `products`, which must come with
+    their stripe_price loaded. Only products without a current price cost
+    a Stripe call, made in parallel; the results are stored for next time.
+    """
+    ids, stale = {}, []
+    for product in products:
+        price = getattr(product, "stripe_price", None)
+        if price is not None and price.unit_amount == unit_amount(product):
+            ids[product.pk] = price.price_id
+        else:
+            stale.append(product)
+    if not stale:
+        return ids
+
+    with ThreadPoolExecutor(settings.STRIPE_MAX_WORKERS) as executor:
+        created = list(executor.map(_create_price, stale))
+
+    now = timezone.now()
+    StripePrice.objects.bulk_create(
+        [
+            StripePrice(
+                product=product,
+                price_id=price.id,
+                unit_amount=unit_amount(product),
+                currency=CURRENCY,
+                updated_at=now,
+            )
+            for product, price in zip(stale, created)
+        ],
+        update_conflicts=True,
+        unique_fields=["product"],
+        update_fields=["price_id", "unit_amount", "currency", "updated_at"],
+    )
+    ids.update((product.pk, price.id) for product, price in zip(stale, created))
+    return ids
+
+
+def line_items(lines):
+    """Stripe Checkout line items referencing each product's cached price."""
+    ids = price_ids({line.product_id: line.product for line in lines}.values())
+    return [
+        {"price": ids[line.product_id], "quantity": line.quantity} for line in lines
+    ]
+
+
+def _create_price(product):
+    return stripe.Price.create(
+        currency=CURRENCY,
+        unit_amount=unit_amount(product),
+        product_data={"name": product.product_name},
+        metadata={"product_id": product.pk},
+    )
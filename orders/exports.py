@@ -0,0 +1,119 @@
+import csv
+import io
+import zlib
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from orders.filters import apply_filters
+from orders.models import OrderDetails, Payments
+
+FORMATS = ("csv", "ndjson")
+CONTENT_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+# Rows are encoded into chunks of about this many bytes, so a response or
+# file gets a few large writes instead of one per row.
+BUFFER_SIZE = 64 * 1024
+
+ORDER_COLUMNS = {
+    "order_id": "id",
+    "order_date": "order_date",
+    "order_status": "order_status",
+    "user_id": "user_id",
+    "user_email": "user__email",
+    "order_total": "total_price",
+    "item_id": "items__id",
+    "product_id": "items__product_id",
+    "product_name": "items__product_name",
+    "quantity": "items__quantity",
+    "price": "items__price",
+}
+
+PAYMENT_COLUMNS = {
+    "payment_id": "id",
+    # updated_at is the auto_now_add field, i.e. when the payment was recorded
+    "paid_at": "updated_at",
+    "user_id": "user_id",
+    "user_email": "user__email",
+    "order_id": "order_id_id",
+    "plan_id": "selected_plan_id_id",
+    "amount": "amount",
+    "payment_status": "payment_status",
+    "stripe_payment_id": "stripe_payment_id",
+}
+
+
+def orders(filters):
+    """
+    One row per order line, orders without lines as a single row with
+    empty item columns, oldest first. Takes orders.filters filters.
+    """
+    queryset = apply_filters(OrderDetails.objects.all(), filters)
+    return ORDER_COLUMNS, queryset.order_by("order_date", "id", "items__id")
+
+
+def payments(filters):
+    """Payments recorded within the filters' since/until, oldest first."""
+    queryset = Payments.objects.all()
+    if "since" in filters:
+        queryset = queryset.filter(updated_at__gte=filters["since"])
+    if "until" in filters:
+        queryset = queryset.filter(updated_at__lte=filters["until"])
+    return PAYMENT_COLUMNS, queryset.order_by("updated_at", "id")
+
+
+EXPORTS = {"orders": orders, "payments": payments}
+
+
+def stream(kind, filters, fmt="csv", compress=False, chunk_size=None):
+    """
+    Yield the export as bytes chunks.
+
+    Rows come from one query read through a server-side cursor
+    chunk_size rows at a time, and every chunk is encoded and yielded
+    before the next is fetched, so memory stays flat however many rows
+    there are and the first bytes go out as soon as the query starts
+    returning.
+    """
+    columns, queryset = EXPORTS[kind](filters)
+    rows = queryset.values_list(*columns.values()).iterator(
+        chunk_size=chunk_size or settings.EXPORT_CHUNK_SIZE
+    )
+    chunks = encode(columns, rows, fmt)
+    return gzipped(chunks) if compress else chunks
+
+
+def encode(columns, rows, fmt):
+    names = list(columns)
+    buffer = io.StringIO()
+    if fmt == "csv":
+        writer = csv.writer(buffer)
+        writer.writerow(names)
+        write = writer.writerow
+    else:
+        encoder = DjangoJSONEncoder(separators=(",", ":"))
+
+        def write(row):
+            buffer.write(encoder.encode(dict(zip(names, row))))
+            buffer.write("\n")
+
+    for row in rows:
+        write(row)
+        if buffer.tell() >= BUFFER_SIZE:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def gzipped(chunks):
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def filename(kind, fmt, compress=False):
+    return f"{kind}.{fmt}" + (".gz" if compress else "")
@@ -0,0 +1,77 @@
+from datetime import datetime, time
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from orders.models import OrderDetails
+
+
+def parse_filters(query_params):
+    """
+    Read order history filters from the query string.
+
+    ?status=booked,delivered   orders in any of the statuses
+    ?user=7                    orders of one user (staff only)
+    ?since=2026-01-01          placed on or after the date or datetime
+    ?until=2026-01-31          placed on or before it; a date means the whole day
+    """
+    filters = {}
+
+    raw_statuses = ",".join(query_params.getlist("status"))
+    if raw_statuses:
+        statuses = sorted({value for value in raw_statuses.split(",") if value})
+        unknown = set(statuses) - set(OrderDetails.OrderStatus.values)
+        if unknown:
+            raise ValidationError(
+                {"status": f"Unknown status: {', '.join(sorted(unknown))}."}
+            )
+        filters["statuses"] = statuses
+
+    user = query_params.get("user")
+    if user not in (None, ""):
+        try:
+            filters["user"] = int(user)
+        except ValueError:
+            raise ValidationError({"user": "Expected an id."})
+
+    for name, end_of_day in (("since", False), ("until", True)):
+        value = query_params.get(name)
+        if value in (None, ""):
+            continue
+        moment = parse_moment(value, end_of_day)
+        if moment is None:
+            raise ValidationError({name: "Expected an ISO 8601 date or datetime."})
+        filters[name] = moment
+
+    return filters
+
+
+def parse_moment(value, end_of_day=False):
+    try:
+        # parse_datetime() would also take a bare date, as midnight.
+        day = parse_date(value)
+        if day is not None:
+            moment = datetime.combine(day, time.max if end_of_day else time.min)
+        else:
+            moment = parse_datetime(value)
+    except ValueError:
+        return None
+    if moment is None:
+        return None
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def apply_filters(queryset, filters):
+    """Filter an OrderDetails queryset."""
+    if "statuses" in filters:
+        queryset = queryset.filter(order_status__in=filters["statuses"])
+    if "user" in filters:
+        queryset = queryset.filter(user_id=filters["user"])
+    if "since" in filters:
+        queryset = queryset.filter(order_date__gte=filters["since"])
+    if "until" in filters:
+        queryset = queryset.filter(order_date__lte=filters["until"])
+    return queryset
@@ -0,0 +1,77 @@
+import logging
+
+from django.db import transaction
+
+from accounts.models import CustomUser
+from cart.models import CartItem
+from cart.store import get_store
+from plans.models import UserSubscription
+from products import leaderboard
+
+from .models import Payments, SubscriptionPlan
+from .services import materialize_order
+
+logger = logging.getLogger(__name__)
+
+
+def handle_event(event):
+    """Apply a Stripe event received on the orders webhook."""
+    data = event["data"]["object"]
+    if "lines" in data:
+        session = data["lines"]["data"][0]["metadata"]
+    else:
+        session = data["metadata"]
+        if session == {}:
+            return
+    user = int(session["user_id"])
+
+    if (
+        event["type"] == "invoice.payment_succeeded"
+        and session["type"] == "plan_subscription"
+    ):
+        user_id = CustomUser.objects.get(id=user)
+        selected_plan = SubscriptionPlan.objects.get(
+            id=int(data["subscription_details"]["metadata"]["selected_plan"])
+        )
+        # Raises DoesNotExist, so the event is retried later
+        user_subscription = UserSubscription.objects.get(user=user_id)
+        user_subscription.payment_status = True
+        user_subscription.status = "active"
+        user_subscription.save()
+        Payments.objects.create(
+            user=user_id,
+            stripe_payment_id=data["payment_intent"],
+            amount=data["amount_paid"] / 100,
+            payment_status="paid",
+            selected_plan_id=selected_plan,
+        )
+        logger.info("Updated subscription for user %s to active.", user)
+
+    elif event["type"] == "payment_intent.succeeded" and session["type"] == "order":
+        user = CustomUser.objects.get(id=user)
+
+        # Pending cart changes are written first, and the cart stays
+        # locked until it has been turned into the order.
+        with get_store().checkout(user):
+            lines = list(
+                CartItem.objects.filter(session__user=user).select_related("product")
+            )
+            if not lines:
+                logger.warning(
+                    "Payment %s succeeded with no items in the cart of user %s.",
+                    data["id"],
+                    user.pk,
+                )
+                return
+
+            with transaction.atomic():
+                materialize_order(
+                    user,
+                    lines[0].session_id,
+                    lines,
+                    stripe_payment_id=data["id"],
+                    amount=data["amount"] / 100,
+                )
+                leaderboard.record_sales(
+                    {line.product_id: line.quantity for line in lines}
+                )
@@ -0,0 +1,9 @@
+from .export_orders import Command as ExportCommand
+
+
+class Command(ExportCommand):
+    help = (
+        "Write every payment as CSV or NDJSON to a file or stdout, reading "
+        "through a server-side cursor."
+    )
+    kind = "payments"
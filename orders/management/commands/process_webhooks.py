@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from orders import webhooks
+
+
+class Command(BaseCommand):
+    help = (
+        "Handle the Stripe events waiting in the webhook inbox. Drains it once, "
+        "or with --forever keeps polling as a worker process."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument("--forever", action="store_true")
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait when the inbox is empty (with --forever).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            counts = webhooks.process(options["batch_size"])
+            if any(counts.values()):
+                self.stdout.write(
+                    f"Processed {counts['processed']} events, "
+                    f"{counts['retried']} to retry, {counts['dead']} dead"
+                )
+            if not options["forever"]:
+                return
+            connection.close_if_unusable_or_obsolete()
+            time.sleep(options["interval"])
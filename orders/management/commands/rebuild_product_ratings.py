@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.models import Review
+from products import ratings
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the denormalized product rating totals with the reviews and "
+        "correct any that drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report drifted products, failing if there are any.",
+        )
+
+    def handle(self, *args, **options):
+        reviews = Review.objects.all()
+        if not options["check"]:
+            total = ratings.rebuild(reviews)
+            self.stdout.write(self.style.SUCCESS(f"Corrected {total} products."))
+            return
+
+        drifted = ratings.differences(reviews)
+        for product_id, (stored, expected) in sorted(drifted.items()):
+            self.stdout.write(
+                f"Product {product_id}: stored {stored.count} reviews totalling "
+                f"{stored.total}, expected {expected.count} totalling "
+                f"{expected.total}"
+            )
+        if drifted:
+            raise CommandError(f"{len(drifted)} products drifted.")
+        self.stdout.write(self.style.SUCCESS("All product ratings match."))
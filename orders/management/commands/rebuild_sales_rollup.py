@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from orders.models import OrderDetails, OrderItems
+from products import leaderboard
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the units sold per product and day behind the top-sellers "
+        "leaderboard from the order history."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=None,
+            help="Only rebuild the last N days (default: the whole history).",
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options["days"]:
+            since = timezone.localdate() - timedelta(days=options["days"] - 1)
+        items = OrderItems.objects.exclude(
+            order__order_status=OrderDetails.OrderStatus.CANCELED
+        )
+        total = leaderboard.rebuild_sales(items, since)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {total} daily sales rows."))
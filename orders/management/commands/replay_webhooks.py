@@ -0,0 +1,77 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from orders import webhooks
+from orders.models import WebhookEvent
+
+
+class Command(BaseCommand):
+    help = (
+        "Feed recorded Stripe events through the webhook inbox, e.g. to load "
+        "test process_webhooks. Fixtures are JSON files holding one event or a "
+        "list of them, or NDJSON with one event per line. Signatures aren't "
+        "checked, so only replay events you trust."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("fixtures", nargs="+")
+        parser.add_argument(
+            "--endpoint",
+            choices=WebhookEvent.Endpoint.values,
+            default=WebhookEvent.Endpoint.ORDERS,
+        )
+        parser.add_argument(
+            "--copies",
+            type=int,
+            default=1,
+            help="Store each event this many times under fresh ids.",
+        )
+        parser.add_argument(
+            "--process",
+            action="store_true",
+            help="Drain the inbox afterwards and report the throughput.",
+        )
+
+    def handle(self, *args, **options):
+        events = []
+        for path in options["fixtures"]:
+            events.extend(self.read(path))
+
+        copies = options["copies"]
+        if copies > 1:
+            events = [
+                {**event, "id": f"{event['id']}-replay-{copy}"}
+                for copy in range(copies)
+                for event in events
+            ]
+        webhooks.store(events, options["endpoint"])
+        self.stdout.write(f"Stored {len(events)} events.")
+
+        if options["process"]:
+            started = time.perf_counter()
+            counts = webhooks.process(stdout=self.stdout)
+            elapsed = time.perf_counter() - started
+            handled = sum(counts.values())
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Handled {handled} events in {elapsed:.2f}s "
+                    f"({handled / elapsed if elapsed else 0:.0f}/s): "
+                    f"{counts['processed']} processed, {counts['retried']} to "
+                    f"retry, {counts['dead']} dead."
+                )
+            )
+
+    def read(self, path):
+        try:
+            with open(path) as handle:
+                text = handle.read()
+        except OSError as error:
+            raise CommandError(f"Could not read {path}: {error}")
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError:
+            # Not one JSON document, so NDJSON
+            return [json.loads(line) for line in text.splitlines() if line.strip()]
+        return data if isinstance(data, list) else [data]
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from orders import recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        "Fold orders placed since the last run into the product co-occurrence "
+        "counts and refresh frequently-bought-together rankings."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Discard all counts and process the whole order history.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=5000)
+        parser.add_argument("--top-k", type=int, default=None)
+
+    def handle(self, *args, **options):
+        run = recommendations.rebuild if options["rebuild"] else recommendations.update
+        total = run(
+            chunk_size=options["chunk_size"],
+            top_k=options["top_k"],
+            stdout=self.stdout,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Processed {total} orders."))
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0004_product_co_occurrence"),
+        ("products", "0010_product_sales_daily"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StripePrice",
+            fields=[
+                (
+                    "product",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stripe_price",
+                        serialize=False,
+                        to="products.product",
+                    ),
+                ),
+                ("price_id", models.CharField(max_length=255)),
+                ("unit_amount", models.PositiveIntegerField()),
+                ("currency", models.CharField(default="usd", max_length=3)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
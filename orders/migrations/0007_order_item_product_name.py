@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:26
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_product_names(apps, schema_editor):
+    # Lines placed before the snapshot take the product's current name.
+    OrderItems = apps.get_model("orders", "OrderItems")
+    Product = apps.get_model("products", "Product")
+    OrderItems.objects.update(
+        product_name=Subquery(
+            Product.objects.filter(pk=OuterRef("product_id")).values("product_name")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0006_webhook_event"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="orderitems",
+            name="product_name",
+            field=models.CharField(blank=True, default="", max_length=200),
+        ),
+        migrations.RunPython(backfill_product_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0007_order_item_product_name"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="orderdetails",
+            index=models.Index(fields=["-order_date", "-id"], name="order_date_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="orderdetails",
+            index=models.Index(
+                fields=["user", "-order_date", "-id"], name="order_user_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="orderdetails",
+            index=models.Index(
+                fields=["order_status", "-order_date", "-id"],
+                name="order_status_date_idx",
+            ),
+        ),
+    ]
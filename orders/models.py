@@ -22,12 +22,26 @@ class OrderDetails(models.Model):
     created_at = models.DateTimeField(auto_now=True)
     updated_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["-order_date", "-id"], name="order_date_id_idx"),
+            models.Index(
+                fields=["user", "-order_date", "-id"], name="order_user_date_idx"
+            ),
+            models.Index(
+                fields=["order_status", "-order_date", "-id"],
+                name="order_status_date_idx",
+            ),
+        ]
+
 
 class OrderItems(models.Model):
     order = models.ForeignKey(
         OrderDetails, on_delete=models.CASCADE, related_name="items"
     )
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    # Name and price as they were when the order was placed
+    product_name = models.CharField(max_length=200, blank=True, default="")
     quantity = models.IntegerField(default=1)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     created_at = models.DateTimeField(auto_now=True)
@@ -71,4 +85,109 @@ class Review(models.Model):
         )
 
     def __str__(self):
-        return f"Review for {self.order_item.product.name} by {self.user.username}"
+        return f"Review for {self.order_item.product_name} by {self.user.username}"
+
+
+class ProductPairCount(models.Model):
+    """
+    Number of orders containing both products. Stored in both directions so
+    one product's pairs are a single index range.
+    """
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+")
+    related = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+")
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "related"], name="product_pair_count_unique"
+            ),
+        ]
+
+
+class RelatedProduct(models.Model):
+    """Top products bought together with `product`, ranked from 1."""
+
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="related_products"
+    )
+    related = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="recommended_with"
+    )
+    count = models.PositiveIntegerField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "rank"], name="related_product_rank_unique"
+            ),
+        ]
+
+
+class CoOccurrenceState(models.Model):
+    """Single row: the last order folded into ProductPairCount."""
+
+    last_order_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class StripePrice(models.Model):
+    """
+    The Stripe Price checkout uses for a product. Stripe prices can't be
+    changed, so a new one is created when the product's price moves.
+    """
+
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stripe_price",
+    )
+    price_id = models.CharField(max_length=255)
+    unit_amount = models.PositiveIntegerField()  # In cents
+    currency = models.CharField(max_length=3, default="usd")
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class WebhookEvent(models.Model):
+    """
+    A verified Stripe event waiting for, or done with, processing. Stripe
+    delivers one event to every endpoint subscribed to it, so an event is
+    unique per endpoint.
+    """
+
+    class Endpoint(models.TextChoices):
+        ORDERS = "orders", "Orders"
+        SUBSCRIPTIONS = "subscriptions", "Subscriptions"
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        PROCESSED = "processed", "Processed"
+        DEAD = "dead", "Dead"
+
+    event_id = models.CharField(max_length=255)
+    endpoint = models.CharField(max_length=20, choices=Endpoint.choices)
+    type = models.CharField(max_length=100)
+    payload = models.JSONField()
+    status = models.CharField(
+        max_length=20, choices=Status.choices, default=Status.PENDING
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    available_at = models.DateTimeField()  # Not retried before this
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["endpoint", "event_id"], name="webhook_event_unique"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["status", "available_at"], name="webhook_event_due_idx"
+            ),
+        ]
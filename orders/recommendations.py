@@ -0,0 +1,124 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from orders.models import (CoOccurrenceState, OrderDetails, OrderItems,
+                           ProductPairCount, RelatedProduct)
+
+# Orders younger than this are left for the next run, so one committing
+# late with a lower id than an already processed order isn't skipped.
+SETTLE_DELAY = timedelta(minutes=5)
+
+
+def update(chunk_size=5000, top_k=None, settle_delay=SETTLE_DELAY, stdout=None):
+    """
+    Fold orders placed since the last run into the pair counts and refresh
+    the top-K of every product those orders touched.
+
+    Work is proportional to the new orders, not the order history: each
+    chunk of orders costs one grouped self-join over their items, a read
+    and an upsert of the affected pairs, and one windowed query for the
+    new rankings. Returns the number of orders processed.
+    """
+    top_k = top_k or settings.RELATED_PRODUCTS_TOP_K
+    cutoff = timezone.now() - settle_delay
+    processed = 0
+    while True:
+        with transaction.atomic():
+            # The row lock keeps two runs from folding the same orders.
+            state, _ = CoOccurrenceState.objects.select_for_update().get_or_create(pk=1)
+            order_ids = list(
+                OrderDetails.objects.filter(
+                    pk__gt=state.last_order_id, order_date__lte=cutoff
+                )
+                .order_by("pk")
+                .values_list("pk", flat=True)[:chunk_size]
+            )
+            if not order_ids:
+                return processed
+
+            touched = merge_pair_counts(order_ids)
+            rank(touched, top_k)
+
+            state.last_order_id = order_ids[-1]
+            state.save()
+
+        processed += len(order_ids)
+        if stdout is not None:
+            stdout.write(f"Processed {processed} orders")
+
+
+def merge_pair_counts(order_ids):
+    """Add the given orders' co-occurrences; returns the products touched."""
+    # Each item joined to the other items of its order yields both
+    # directions of every pair. Canceled orders and repeated lines of one
+    # product don't count.
+    pairs = (
+        OrderItems.objects.filter(order_id__in=order_ids)
+        .exclude(order__order_status=OrderDetails.OrderStatus.CANCELED)
+        .annotate(related=F("order__items__product_id"))
+        .exclude(related=F("product_id"))
+        .values_list("product_id", "related")
+        .annotate(count=Count("order_id", distinct=True))
+        .order_by()
+    )
+    deltas = {(product, related): count for product, related, count in pairs}
+    if not deltas:
+        return set()
+
+    products = {product for product, _ in deltas}
+    existing = ProductPairCount.objects.filter(
+        product_id__in=products, related_id__in=products
+    ).values_list("product_id", "related_id", "count")
+    for product, related, count in existing.iterator():
+        if (product, related) in deltas:
+            deltas[product, related] += count
+
+    ProductPairCount.objects.bulk_create(
+        [
+            ProductPairCount(product_id=product, related_id=related, count=count)
+            for (product, related), count in deltas.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["product", "related"],
+        update_fields=["count"],
+        batch_size=1000,
+    )
+    return products
+
+
+def rank(product_ids, top_k):
+    """Rewrite the top-K rows of the given products from their pair counts."""
+    if not product_ids:
+        return
+    ranked = (
+        ProductPairCount.objects.filter(product_id__in=product_ids)
+        .annotate(
+            rank=Window(
+                RowNumber(),
+                partition_by=[F("product_id")],
+                order_by=[F("count").desc(), F("related_id").asc()],
+            )
+        )
+        .filter(rank__lte=top_k)
+        .values_list("product_id", "related_id", "count", "rank")
+    )
+    rows = [
+        RelatedProduct(product_id=product, related_id=related, count=count, rank=rank)
+        for product, related, count, rank in ranked
+    ]
+    RelatedProduct.objects.filter(product_id__in=product_ids).delete()
+    RelatedProduct.objects.bulk_create(rows, batch_size=1000)
+
+
+def rebuild(chunk_size=5000, top_k=None, stdout=None):
+    """Drop every count and fold the whole order history again."""
+    with transaction.atomic():
+        ProductPairCount.objects.all().delete()
+        RelatedProduct.objects.all().delete()
+        CoOccurrenceState.objects.update_or_create(pk=1, defaults={"last_order_id": 0})
+    return update(chunk_size, top_k, stdout=stdout)
@@ -9,7 +9,7 @@ class OrderItemsSerializer(serializers.ModelSerializer):
     # Product=ProductSerializer()
     class Meta:
         model = OrderItems
-        fields = ["product", "quantity", "price"]
+        fields = ["product", "product_name", "quantity", "price"]
 
 
 class OrderDetailsSerializer(serializers.ModelSerializer):
@@ -51,7 +51,7 @@ class ReviewSerializer(serializers.ModelSerializer):
 
 class GetReviewSerializer(serializers.ModelSerializer):
     product_name = serializers.CharField(
-        source="order_item.product.name", read_only=True
+        source="order_item.product_name", read_only=True
     )
 
     class Meta:
@@ -1,3 +1,259 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import itertools
+import json
+import os
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import CustomUser
+from cart.models import CartItem, ShoppingSession
+from orders import checkout, webhooks
+from orders.models import OrderDetails, OrderItems, StripePrice, WebhookEvent
+from products.models import Product, ProductInventory
+
+
+class CheckoutTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="buyer@example.com", password="x", stripe_customer_id="cus_1"
+        )
+        session = ShoppingSession.objects.create(user=self.user)
+        self.products = []
+        for i in range(5):
+            product = Product.objects.create(
+                product_name=f"p{i}", product_description="d", product_price=i + 1
+            )
+            ProductInventory.objects.create(product=product, quantity=10)
+            CartItem.objects.create(session=session, product=product, quantity=2)
+            self.products.append(product)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        ids = itertools.count(1)
+        self.price_create = self.patch(
+            "stripe.Price.create",
+            side_effect=lambda **kwargs: SimpleNamespace(id=f"price_{next(ids)}"),
+        )
+        self.session_create = self.patch(
+            "stripe.checkout.Session.create",
+            return_value=SimpleNamespace(url="https://checkout.stripe.test/s"),
+        )
+
+    def patch(self, target, **kwargs):
+        patcher = mock.patch(target, **kwargs)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def checkout(self):
+        response = self.client.post("/api/order/session-checkout/")
+        self.assertEqual(response.status_code, 303)
+        return self.session_create.call_args.kwargs["line_items"]
+
+    def test_cart_loads_in_one_query(self):
+        with self.assertNumQueries(1):
+            lines = checkout.load_cart(self.user)
+            for line in lines:
+                line.product.inventory
+                getattr(line.product, "stripe_price", None)
+        self.assertEqual(len(lines), 5)
+
+    def test_prices_are_reused(self):
+        first = self.checkout()
+        self.assertEqual(self.price_create.call_count, 5)
+        self.assertEqual(StripePrice.objects.count(), 5)
+
+        second = self.checkout()
+        self.assertEqual(self.price_create.call_count, 5)
+        self.assertEqual(second, first)
+
+    def test_price_change_creates_new_price(self):
+        self.checkout()
+        product = self.products[0]
+        product.product_price = 99
+        product.save()
+
+        line_items = self.checkout()
+        self.assertEqual(self.price_create.call_count, 6)
+        self.assertEqual(self.price_create.call_args.kwargs["unit_amount"], 9900)
+        self.assertEqual(line_items[0]["price"], "price_6")
+        self.assertEqual(StripePrice.objects.get(product=product).unit_amount, 9900)
+
+
+class OrderHistoryTests(TestCase):
+    # The page with its users joined, then the prefetched items.
+    PAGE_QUERIES = 2
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = CustomUser.objects.create_user(
+            email="staff@example.com", password="x", is_staff=True
+        )
+        cls.customers = [
+            CustomUser.objects.create_user(email=f"c{i}@example.com", password="x")
+            for i in range(3)
+        ]
+        product = Product.objects.create(
+            product_name="p", product_description="d", product_price=1
+        )
+        cls.orders = OrderDetails.objects.bulk_create(
+            [
+                OrderDetails(
+                    user=cls.customers[i % 3],
+                    order_status=OrderDetails.OrderStatus.BOOKED,
+                )
+                for i in range(45)
+            ]
+        )
+        OrderItems.objects.bulk_create(
+            [
+                OrderItems(
+                    order=order, product=product, product_name="p", quantity=1, price=1
+                )
+                for order in cls.orders
+                for _ in range(3)
+            ]
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def get(self, url, queries=None):
+        if queries is None:
+            return self.client.get(url)
+        with self.assertNumQueries(queries):
+            return self.client.get(url)
+
+    def test_query_count_is_constant_per_page(self):
+        self.client.force_authenticate(self.staff)
+        for size in (5, 20):
+            with self.subTest(page_size=size):
+                response = self.get(f"/api/order/?page_size={size}", self.PAGE_QUERIES)
+                seen = [order["id"] for order in response.data["results"]]
+                self.assertEqual(len(response.data["results"][0]["items"]), 3)
+                while response.data["next"]:
+                    response = self.get(response.data["next"], self.PAGE_QUERIES)
+                    seen += [order["id"] for order in response.data["results"]]
+                self.assertEqual(sorted(seen), sorted(o.pk for o in self.orders))
+
+    def test_bad_status_is_rejected(self):
+        self.client.force_authenticate(self.staff)
+        response = self.get("/api/order/?status=shipped")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("status", response.data)
+
+    def test_customers_only_see_their_orders(self):
+        customer, other = self.customers[0], self.customers[1]
+        theirs = next(order for order in self.orders if order.user_id == other.pk)
+        self.client.force_authenticate(customer)
+
+        self.assertEqual(self.get(f"/api/order/?id={theirs.pk}").status_code, 404)
+        response = self.get(f"/api/order/?user={other.pk}")
+        self.assertEqual(
+            {order["user"]["id"] for order in response.data["results"]}, {customer.pk}
+        )
+
+
+@override_settings(WEBHOOK_MAX_ATTEMPTS=3, WEBHOOK_RETRY_DELAY=30)
+class WebhookTests(TestCase):
+    SECRET = "whsec_test"
+
+    def setUp(self):
+        patcher = mock.patch.dict(os.environ, {"STRIPE_WEBHOOK_SECRET": self.SECRET})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = CustomUser.objects.create_user(
+            email="buyer@example.com", password="x"
+        )
+        session = ShoppingSession.objects.create(user=self.user)
+        product = Product.objects.create(
+            product_name="p", product_description="d", product_price=6
+        )
+        ProductInventory.objects.create(product=product, quantity=10)
+        CartItem.objects.create(session=session, product=product, quantity=2)
+        self.client = APIClient()
+
+    def event(self):
+        return {
+            "id": "evt_1",
+            "object": "event",
+            "type": "payment_intent.succeeded",
+            "data": {
+                "object": {
+                    "id": "pi_1",
+                    "object": "payment_intent",
+                    "amount": 1200,
+                    "metadata": {"type": "order", "user_id": str(self.user.pk)},
+                }
+            },
+        }
+
+    def post(self, event, secret=SECRET):
+        body = json.dumps(event)
+        timestamp = int(time.time())
+        signature = hmac.new(
+            secret.encode(), f"{timestamp}.{body}".encode(), hashlib.sha256
+        ).hexdigest()
+        return self.client.post(
+            "/api/stripe/webhook/",
+            body,
+            content_type="application/json",
+            HTTP_STRIPE_SIGNATURE=f"t={timestamp},v1={signature}",
+        )
+
+    def test_redelivered_event_is_handled_once(self):
+        for _ in range(2):
+            self.assertEqual(self.post(self.event()).status_code, 200)
+        self.assertEqual(WebhookEvent.objects.count(), 1)
+
+        self.assertEqual(webhooks.process()["processed"], 1)
+        self.assertEqual(self.post(self.event()).status_code, 200)
+        self.assertEqual(webhooks.process()["processed"], 0)
+
+        event = WebhookEvent.objects.get()
+        self.assertEqual(event.status, WebhookEvent.Status.PROCESSED)
+        self.assertEqual(OrderDetails.objects.filter(user=self.user).count(), 1)
+
+    def test_failing_event_is_retried_then_dead(self):
+        self.post(self.event())
+        failing = mock.patch(
+            "orders.handlers.handle_event", side_effect=RuntimeError("boom")
+        )
+        with failing, self.assertLogs("orders.webhooks", "ERROR") as logs:
+            for attempt, delay in ((1, 30), (2, 60)):
+                before = timezone.now()
+                counts = webhooks.process()
+                self.assertEqual(counts, {"processed": 0, "retried": 1, "dead": 0})
+                event = WebhookEvent.objects.get()
+                self.assertEqual(event.status, WebhookEvent.Status.PENDING)
+                self.assertEqual(event.attempts, attempt)
+                self.assertIn("boom", event.last_error)
+                self.assertGreaterEqual(
+                    event.available_at, before + timedelta(seconds=delay)
+                )
+                # Not due yet, so it is left alone until the clock catches up.
+                self.assertEqual(webhooks.process()["retried"], 0)
+                WebhookEvent.objects.update(available_at=timezone.now())
+
+            counts = webhooks.process()
+
+        self.assertEqual(len(logs.records), 3)
+        self.assertEqual(counts, {"processed": 0, "retried": 0, "dead": 1})
+        event = WebhookEvent.objects.get()
+        self.assertEqual(event.status, WebhookEvent.Status.DEAD)
+        self.assertEqual(event.attempts, 3)
+        self.assertEqual(webhooks.process(), {"processed": 0, "retried": 0, "dead": 0})
+        self.assertEqual(OrderDetails.objects.count(), 0)
+
+    def test_invalid_signature_is_rejected(self):
+        response = self.post(self.event(), secret="whsec_wrong")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(WebhookEvent.objects.exists())
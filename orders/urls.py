@@ -1,8 +1,9 @@
 from django.urls import path
 
 from .views import (CreateOrder, CreateReviewView,
-                    EligibleOrderItemsForReviewView, GetAllOrders,
-                    PaymentListView, ProductReviewsView,
+                    EligibleOrderItemsForReviewView, ExportOrders,
+                    ExportPayments, GetAllOrders, PaymentListView,
+                    ProductReviewsView, RelatedProductsView,
                     StripeWebhookCreateAPIView, UpdateOrderStatus)
 
 urlpatterns = [
@@ -17,12 +18,19 @@ urlpatterns = [
         "stripe/webhook/", StripeWebhookCreateAPIView.as_view(), name="stripe-webhook"
     ),
     path("payments/", PaymentListView.as_view(), name="payment-list"),
+    path("order/export/", ExportOrders.as_view(), name="export-orders"),
+    path("payments/export/", ExportPayments.as_view(), name="export-payments"),
     path("reviews/", CreateReviewView.as_view(), name="review-create"),
     path(
         "products/<int:product_id>/reviews/",
         ProductReviewsView.as_view(),
         name="product-reviews",
     ),
+    path(
+        "products/<int:pk>/related/",
+        RelatedProductsView.as_view(),
+        name="related-products",
+    ),
     path(
         "eligible-order-items-for-review/",
         EligibleOrderItemsForReviewView.as_view(),
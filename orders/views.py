@@ -1,7 +1,9 @@
 import environ
 import stripe
+from django.conf import settings
 from django.db import transaction
-from django.db.models import Q
+from django.db.models import F, Q
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from rest_framework import status
 from rest_framework.exceptions import NotFound, PermissionDenied
@@ -10,12 +12,15 @@ from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from accounts.models import CustomUser
-from cart.models import CartItem, ShoppingSession
-from plans.models import UserSubscription
+from cart.store import get_store
+from orders import checkout, exports, webhooks
+from orders.filters import apply_filters, parse_filters
+from products import ratings
+from products.models import Product
+from products.serializers import GetProductSerializer
+from utils.pagination import KeysetPagination
 
-from .models import (OrderDetails, OrderItems, Payments, Review,
-                     SubscriptionPlan)
+from .models import OrderDetails, OrderItems, Payments, Review, WebhookEvent
 from .serializers import (GetReviewSerializer, OrderDetailsSerializer,
                           OrderItemSerializer, OrderStatusUpdateSerializer,
                           PaymentSerializer, ReviewSerializer)
@@ -24,6 +29,7 @@ env = environ.Env()
 environ.Env.read_env()
 
 stripe.api_key = env("STRIPE_SECRET_KEY")
+stripe.api_base = settings.STRIPE_API_BASE
 
 
 class CreateOrder(CreateAPIView):
@@ -33,30 +39,19 @@ class CreateOrder(CreateAPIView):
     def create(self, request, *args, **kwargs):
         user = request.user
 
-        session = get_object_or_404(ShoppingSession, user=user)
-
-        cart_items = CartItem.objects.filter(session=session)
-        if not cart_items.exists():
+        get_store().flush(user)
+        lines = checkout.load_cart(user)
+        if not lines:
             return Response(
                 {"detail": "No items in the cart."}, status=status.HTTP_404_NOT_FOUND
             )
-        total_price = 0
-        total_price = 0
-        line_items = []
-        for item in cart_items:
-            total_price += item.product.product_price * item.quantity
-            line_items.append(
-                {
-                    "price_data": {
-                        "currency": "usd",
-                        "product_data": {
-                            "name": item.product.product_name,
-                        },
-                        "unit_amount": int(item.product.product_price * 100),
-                    },
-                    "quantity": item.quantity,
-                }
+        unavailable = checkout.unavailable(lines)
+        if unavailable:
+            return Response(
+                {"detail": "Some products are unavailable.", "products": unavailable},
+                status=status.HTTP_409_CONFLICT,
             )
+
         customer_id = user.stripe_customer_id
         if not customer_id:
             new_customer = stripe.Customer.create(
@@ -70,7 +65,7 @@ class CreateOrder(CreateAPIView):
             checkout_session = stripe.checkout.Session.create(
                 payment_method_types=["card"],
                 customer=customer_id,
-                line_items=line_items,
+                line_items=checkout.line_items(lines),
                 mode="payment",
                 payment_intent_data={"metadata": {"type": "order", "user_id": user.id}},
                 # success_url='http://localhost:8000/payment/success?session_id={CHECKOUT_SESSION_ID}',
@@ -112,144 +107,37 @@ class UpdateOrderStatus(UpdateAPIView):
 
 
 class GetAllOrders(ListAPIView):
-    queryset = OrderDetails.objects.all()
     serializer_class = OrderDetailsSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ("-order_date", "-pk")
 
     def get_queryset(self):
         user = self.request.user
+        filters = parse_filters(self.request.query_params)
+        queryset = OrderDetails.objects.select_related("user").prefetch_related("items")
+        if not user.is_staff:
+            # Customers only ever see their own orders.
+            filters.pop("user", None)
+            queryset = queryset.filter(user=user)
+
         order_id = self.request.query_params.get("id", None)
         if order_id:
             # If 'id' is provided, return the specific order with that id
-            try:
-                order = OrderDetails.objects.get(id=order_id)
-                return OrderDetails.objects.filter(
-                    id=order.id
-                )  # Return only the specific order
-            except OrderDetails.DoesNotExist:
+            queryset = queryset.filter(pk=order_id)
+            if not queryset.exists():
                 raise NotFound("Order not found.")
+            return queryset
 
-        if user.is_staff:
-            return OrderDetails.objects.all()
-        else:
-            return OrderDetails.objects.filter(user=user)
+        return apply_filters(queryset, filters)
 
 
 class StripeWebhookCreateAPIView(CreateAPIView):
 
     def create(self, request, *args, **kwargs):
-        payload = request.body
-        sig_header = request.META.get("HTTP_STRIPE_SIGNATURE")
-        endpoint_secret = env("STRIPE_WEBHOOK_SECRET")
-        event = None
-
-        try:
-            event = stripe.Webhook.construct_event(payload, sig_header, endpoint_secret)
-        except ValueError:
-            return Response(
-                {"error": "Invalid payload"}, status=status.HTTP_400_BAD_REQUEST
-            )
-        except stripe.error.SignatureVerificationError:
-            return Response(
-                {"error": "Invalid signature"}, status=status.HTTP_400_BAD_REQUEST
-            )
-        session = None
-        if hasattr(event["data"]["object"], "lines"):
-            session = event["data"]["object"]["lines"]["data"][0]["metadata"]
-            userId = session["user_id"]
-            user = int(userId)
-        else:
-            session = event["data"]["object"]["metadata"]
-            if session == {}:
-                return Response(
-                    {"status": "unhandled event"}, status=status.HTTP_200_OK
-                )
-            else:
-                userId = session["user_id"]
-                user = int(userId)
-
-        if (
-            event["type"] == "invoice.payment_succeeded"
-            and session["type"] == "plan_subscription"
-        ):
-
-            try:
-                user_id = CustomUser.objects.get(id=user)
-                selected_plan = SubscriptionPlan.objects.get(
-                    id=int(
-                        event["data"]["object"]["subscription_details"]["metadata"][
-                            "selected_plan"
-                        ]
-                    )
-                )
-                user_subscription = UserSubscription.objects.get(user=user_id)
-                user_subscription.payment_status = True
-                user_subscription.status = "active"
-                user_subscription.save()
-                sub_payment_details = Payments.objects.create(user=user_id)
-                sub_payment_details.stripe_payment_id = event["data"]["object"][
-                    "payment_intent"
-                ]
-                sub_payment_details.amount = (
-                    event["data"]["object"]["amount_paid"] / 100
-                )
-                sub_payment_details.user = user_id
-                sub_payment_details.payment_status = "paid"
-                sub_payment_details.selected_plan_id = selected_plan
-                sub_payment_details.save()
-                print(f"Updated subscription for user {user} to active.")
-            except UserSubscription.DoesNotExist:
-                print(f"Subscription not found for user ID {user}.")
-                return Response(
-                    {"detail": "Subscription not found"},
-                    status=status.HTTP_404_NOT_FOUND,
-                )
-
-        elif event["type"] == "payment_intent.succeeded" and session["type"] == "order":
-
-            user = CustomUser.objects.get(id=user)
-
-            shopping_session = ShoppingSession.objects.get(user=user)
-            cart_items = CartItem.objects.filter(session=shopping_session)
-            if cart_items.exists():
-                with transaction.atomic():
-                    order = OrderDetails.objects.create(user=user)
-
-                    total_price = 0
-                    for item in cart_items:
-                        OrderItems.objects.create(
-                            order=order,
-                            product=item.product,
-                            quantity=item.quantity,
-                            price=item.product.product_price,
-                        )
-                        total_price += item.product.product_price * item.quantity
-
-                    order.total_price = total_price
-                    order.save()
-                    payment_details = Payments.objects.create(user=user)
-                    payment_details.stripe_payment_id = event["data"]["object"]["id"]
-                    payment_details.amount = event["data"]["object"]["amount"] / 100
-                    payment_details.user = user
-                    payment_details.payment_status = "paid"
-                    payment_details.order_id = order
-                    payment_details.save()
-
-                    cart_items.delete()
-                    shopping_session.total = 0
-                    shopping_session.save()
-
-                return Response(
-                    {"status": "success", "order_id": order.id},
-                    status=status.HTTP_201_CREATED,
-                )
-
-            return Response(
-                {"error": "No items in the cart to create an order."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
-        return Response({"status": "unhandled event"}, status=status.HTTP_200_OK)
+        return webhooks.receive(
+            request, env("STRIPE_WEBHOOK_SECRET"), WebhookEvent.Endpoint.ORDERS
+        )
 
 
 class PaymentListView(APIView):
@@ -287,8 +175,10 @@ class CreateReviewView(CreateAPIView):
     serializer_class = ReviewSerializer
     permission_classes = [IsAuthenticated]
 
+    @transaction.atomic
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        review = serializer.save(user=self.request.user)
+        ratings.add(review.order_item.product_id, review.rating)
 
 
 def get_eligible_order_items_for_review(user, product_id):
@@ -313,7 +203,22 @@ class ProductReviewsView(ListAPIView):
         # Retrieve the product_id from the URL
         product_id = self.kwargs["product_id"]
         # Filter reviews for the specified product
-        return Review.objects.filter(order_item__product_id=product_id)
+        return Review.objects.filter(order_item__product_id=product_id).select_related(
+            "order_item"
+        )
+
+
+class RelatedProductsView(ListAPIView):
+    # Frequently bought together, from the update_related_products job
+    serializer_class = GetProductSerializer
+
+    def get_queryset(self):
+        return (
+            Product.objects.filter(recommended_with__product_id=self.kwargs["pk"])
+            .annotate(rank=F("recommended_with__rank"))
+            .for_listing()
+            .order_by("rank")
+        )
 
 
 class EligibleOrderItemsForReviewView(ListAPIView):
@@ -328,3 +233,44 @@ class EligibleOrderItemsForReviewView(ListAPIView):
             return OrderItems.objects.none()
 
         return get_eligible_order_items_for_review(user, product_id)
+
+
+class ExportView(APIView):
+    """
+    Stream every matching row as CSV (default) or NDJSON, gzipped with
+    ?gzip=1. Takes the order history filters (?since=, ?until=, and for
+    orders also ?status= and ?user=).
+    """
+
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    kind = None
+
+    def get(self, request, *args, **kwargs):
+        # ?format= is DRF's renderer override, so the file format is ?output=
+        fmt = request.query_params.get("output", "csv")
+        if fmt not in exports.FORMATS:
+            return Response(
+                {"output": f"Expected one of: {', '.join(exports.FORMATS)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        compress = request.query_params.get("gzip", "").lower() in ("1", "true", "yes")
+        filters = parse_filters(request.query_params)
+
+        response = StreamingHttpResponse(
+            exports.stream(self.kind, filters, fmt, compress),
+            content_type=exports.CONTENT_TYPES[fmt],
+        )
+        if compress:
+            # A download of the .gz file, not a transfer encoding to undo.
+            response["Content-Type"] = "application/gzip"
+        filename = exports.filename(self.kind, fmt, compress)
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+
+class ExportOrders(ExportView):
+    kind = "orders"
+
+
+class ExportPayments(ExportView):
+    kind = "payments"
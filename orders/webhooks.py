@@ -0,0 +1,128 @@
+import json
+import logging
+import traceback
+from datetime import timedelta
+
+import stripe
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework import status
+from rest_framework.response import Response
+
+from orders.models import WebhookEvent
+
+logger = logging.getLogger(__name__)
+
+# Handler per endpoint, called with the event payload inside the
+# transaction that marks the event processed.
+HANDLERS = {
+    WebhookEvent.Endpoint.ORDERS: "orders.handlers.handle_event",
+    WebhookEvent.Endpoint.SUBSCRIPTIONS: "plans.handlers.handle_event",
+}
+
+
+def receive(request, secret, endpoint):
+    """
+    Verify a Stripe webhook request and put its event in the inbox.
+
+    Stripe only waits for the 200: processing happens in process_webhooks,
+    and a redelivered event is recognized by its id and not stored twice.
+    """
+    try:
+        stripe.Webhook.construct_event(
+            request.body, request.META.get("HTTP_STRIPE_SIGNATURE"), secret
+        )
+    except ValueError:
+        return Response(
+            {"error": "Invalid payload"}, status=status.HTTP_400_BAD_REQUEST
+        )
+    except stripe.error.SignatureVerificationError:
+        return Response(
+            {"error": "Invalid signature"}, status=status.HTTP_400_BAD_REQUEST
+        )
+
+    store([json.loads(request.body)], endpoint)
+    return Response({"status": "received"}, status=status.HTTP_200_OK)
+
+
+def store(events, endpoint):
+    """Add event payloads to the inbox, skipping ids it already has."""
+    now = timezone.now()
+    WebhookEvent.objects.bulk_create(
+        [
+            WebhookEvent(
+                event_id=event["id"],
+                endpoint=endpoint,
+                type=event["type"],
+                payload=event,
+                available_at=now,
+            )
+            for event in events
+        ],
+        ignore_conflicts=True,
+        batch_size=1000,
+    )
+
+
+def process(batch_size=None, stdout=None):
+    """
+    Handle due inbox events, oldest first, until none are left; returns
+    {"processed", "retried", "dead"} counts.
+
+    Each batch is claimed with row locks that other workers skip, so
+    several workers can drain the inbox together. Every event is handled
+    in its own savepoint and marked processed in the same transaction as
+    its effects, so a handled event is never handled again. A failing
+    event is retried with exponential backoff and, after
+    WEBHOOK_MAX_ATTEMPTS, left dead for inspection.
+    """
+    batch_size = batch_size or settings.WEBHOOK_BATCH_SIZE
+    counts = {"processed": 0, "retried": 0, "dead": 0}
+    while True:
+        with transaction.atomic():
+            now = timezone.now()
+            batch = list(
+                WebhookEvent.objects.select_for_update(skip_locked=True)
+                .filter(status=WebhookEvent.Status.PENDING, available_at__lte=now)
+                .order_by("received_at", "pk")[:batch_size]
+            )
+            if not batch:
+                return counts
+
+            for event in batch:
+                outcome = _handle(event, now)
+                counts[outcome] += 1
+            WebhookEvent.objects.bulk_update(
+                batch,
+                ["status", "attempts", "last_error", "available_at", "processed_at"],
+            )
+
+        if stdout is not None:
+            stdout.write(
+                f"Processed {counts['processed']} events, "
+                f"{counts['retried']} to retry, {counts['dead']} dead"
+            )
+
+
+def _handle(event, now):
+    handler = import_string(HANDLERS[event.endpoint])
+    event.attempts += 1
+    try:
+        with transaction.atomic():
+            handler(event.payload)
+    except Exception:
+        logger.exception("Webhook event %s failed", event.event_id)
+        event.last_error = traceback.format_exc()
+        if event.attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+            event.status = WebhookEvent.Status.DEAD
+            return "dead"
+        delay = settings.WEBHOOK_RETRY_DELAY * 2 ** (event.attempts - 1)
+        event.available_at = now + timedelta(seconds=delay)
+        return "retried"
+
+    event.status = WebhookEvent.Status.PROCESSED
+    event.last_error = ""
+    event.processed_at = now
+    return "processed"
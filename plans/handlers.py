@@ -0,0 +1,22 @@
+import logging
+
+from .models import UserSubscription
+
+logger = logging.getLogger(__name__)
+
+
+def handle_event(event):
+    """Apply a Stripe event received on the subscription webhook."""
+    if event["type"] != "invoice.payment_succeeded":
+        return
+    session = event["data"]["object"]
+    if session["metadata"].get("type") != "plan_subscription":
+        return
+
+    user_id = session["metadata"].get("user_id")
+    # Raises DoesNotExist, so the event is retried later
+    user_subscription = UserSubscription.objects.get(id=int(user_id))
+    user_subscription.payment_status = True
+    user_subscription.status = "active"
+    user_subscription.save()
+    logger.info("Updated subscription for user %s to active.", user_id)
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.2 on 2026-10-17 01:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("plans", "0006_post"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="plans",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+    ]
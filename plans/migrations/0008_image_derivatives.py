@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("plans", "0007_plans_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="derivatives",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
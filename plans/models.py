@@ -20,6 +20,7 @@ class Plans(models.Model):
     duration_days = models.PositiveIntegerField()  # Duration in days for the plan
     subscription_required = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.name} ({self.get_plan_type_display()})"
@@ -160,6 +161,7 @@ class Post(models.Model):
     image = models.ImageField(
         upload_to="post_images/", blank=True, null=True
     )  # Optional: Image for the post
+    derivatives = models.JSONField(default=dict, blank=True)  # {size: URL}
     created_at = models.DateTimeField(auto_now=True)
     updated_at = models.DateTimeField(auto_now_add=True)
 
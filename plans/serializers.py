@@ -3,6 +3,7 @@ from datetime import date, timedelta
 from rest_framework import serializers
 
 from accounts.models import CustomUser
+from utils.derivatives import SizedImageMixin
 
 from .models import (Goals, Plans, Post, SubscriptionPlan, UserGoalProgress,
                      UserPlan, UserSubscription)
@@ -190,12 +191,21 @@ class UserPlanStatusSerializer(serializers.ModelSerializer):
         fields = ["plan", "start_date", "end_date", "status"]
 
 
-class PostSerializer(serializers.ModelSerializer):
+class PostSerializer(SizedImageMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Post
-        fields = ["id", "user", "plan", "content", "image", "created_at", "updated_at"]
-        read_only_fields = ["id", "user"]
+        fields = [
+            "id",
+            "user",
+            "plan",
+            "content",
+            "image",
+            "derivatives",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = ["id", "user", "derivatives"]
 
 
 class GoalPostSerializer(serializers.ModelSerializer):
@@ -218,10 +228,10 @@ class UserPostSerializer:
         fields = ["id", "first_name", "last_name", "email"]
 
 
-class GetPostSerializer(serializers.ModelSerializer):
+class GetPostSerializer(SizedImageMixin, serializers.ModelSerializer):
     plan = PlanPostSerializer()
     user = UserPostSerializer()
 
     class Meta:
         model = Post
-        fields = ["user", "plan", "content", "image", "created_at"]
+        fields = ["user", "plan", "content", "image", "derivatives", "created_at"]
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from plans.models import Post
+from utils import derivatives
+
+
+@receiver(post_save, sender=Post)
+def generate_post_image_derivatives(sender, instance, created, **kwargs):
+    if created and instance.image:
+        derivatives.schedule(instance)
@@ -2,6 +2,7 @@ from datetime import timedelta
 
 import environ
 import stripe
+from django.conf import settings
 from django.http import Http404
 from django.utils import timezone
 from rest_framework import generics, serializers, status
@@ -11,7 +12,10 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from accounts.models import CustomUser
+from orders import webhooks
+from orders.models import WebhookEvent
 from utils.common import IsAdminUser
+from utils.conditional import ConditionalGetMixin
 
 from .models import (Goals, Plans, Post, SubscriptionPlan, UserGoalProgress,
                      UserPlan, UserSubscription)
@@ -26,10 +30,16 @@ from .serializers import (GetPostSerializer, GoalSerializer,
 env = environ.Env()
 environ.Env.read_env()
 stripe.api_key = env("STRIPE_SECRET_KEY")
+stripe.api_base = settings.STRIPE_API_BASE
 
 
-class PlanListCreateView(generics.ListCreateAPIView):
+class PlanListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     queryset = Plans.objects.all()
+    # Goals are nested in the response, so their edits change the version too.
+    version_sources = [
+        (Plans.objects.all(), ["updated_at"]),
+        (Goals.objects.all(), ["created_at", "updated_at"]),
+    ]
 
     def get_serializer_class(self):
         if self.request.method == "POST":
@@ -98,9 +108,10 @@ class GoalsByPlanView(generics.ListAPIView):
         return Goals.objects.filter(plan_id=plan_id)
 
 
-class SubscriptionPlanListCreateView(generics.ListCreateAPIView):
+class SubscriptionPlanListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     queryset = SubscriptionPlan.objects.all()
     serializer_class = SubscriptionPlanSerializer
+    version_sources = [(SubscriptionPlan.objects.all(), ["created_at", "updated_at"])]
 
     def get_permissions(self):
         if self.request.method == "GET":
@@ -254,47 +265,11 @@ class UserAndAdminSubscriptionPlanView(generics.ListAPIView):
 
 class StripeSubscriptionWebhookView(generics.CreateAPIView):
     def post(self, request, *args, **kwargs):
-        payload = request.body
-        sig_header = request.META["HTTP_STRIPE_SIGNATURE"]
-        webhook_secret = env("STRIPE_WEBHOOK_SECRET_SUBSCRIPTION")
-
-        try:
-            event = stripe.Webhook.construct_event(payload, sig_header, webhook_secret)
-
-        except ValueError as e:
-            print(f"Invalid payload: {e}")
-            return Response(
-                {"error": "Invalid payload"}, status=status.HTTP_400_BAD_REQUEST
-            )
-
-        except stripe.error.SignatureVerificationError as e:
-            print(f"Invalid signature: {e}")
-            return Response(
-                {"error": "Invalid signature"}, status=status.HTTP_400_BAD_REQUEST
-            )
-
-        if event["type"] == "invoice.payment_succeeded":
-            session = event["data"]["object"]
-            print(event, 60609090)
-
-            if session["metadata"].get("type") == "plan_subscription":
-                user_id = session["metadata"].get("user_id")
-                user = int(user_id)
-                print(user)
-                try:
-                    user_subscription = UserSubscription.objects.get(id=user)
-                    user_subscription.payment_status = True
-                    user_subscription.status = "active"
-                    user_subscription.save()
-                    print(f"Updated subscription for user {user_id} to active.")
-                except UserSubscription.DoesNotExist:
-                    print(f"Subscription not found for user ID {user_id}.")
-                    return Response(
-                        {"detail": "Subscription not found"},
-                        status=status.HTTP_404_NOT_FOUND,
-                    )
-
-        return Response(status=status.HTTP_200_OK)
+        return webhooks.receive(
+            request,
+            env("STRIPE_WEBHOOK_SECRET_SUBSCRIPTION"),
+            WebhookEvent.Endpoint.SUBSCRIPTIONS,
+        )
 
 
 class StartPlanView(APIView):
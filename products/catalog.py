@@ -0,0 +1,108 @@
+import threading
+
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce, Now
+
+from products.models import Product, ProductCatalogEntry, ProductInventory
+
+_pending = threading.local()
+
+
+def build_entries(products):
+    """Flatten products loaded with Product.objects.for_listing()."""
+    from products.serializers import GetProductSerializer
+
+    products = list(products)
+    # One list serializer builds its fields once for the whole batch.
+    payloads = GetProductSerializer(products, many=True).data
+    entries = []
+    for product, payload in zip(products, payloads):
+        payload = dict(payload)
+        total_quantity = payload.pop("total_quantity")
+        entries.append(
+            ProductCatalogEntry(
+                product=product,
+                payload=payload,
+                total_quantity=total_quantity,
+                created_at=product.created_at,
+            )
+        )
+    return entries
+
+
+def refresh_products(product_ids):
+    """Re-flatten the given products in one upsert."""
+    product_ids = set(product_ids)
+    if not product_ids:
+        return 0
+    products = Product.objects.filter(pk__in=product_ids).for_listing()
+    entries = build_entries(products)
+    ProductCatalogEntry.objects.bulk_create(
+        entries,
+        update_conflicts=True,
+        unique_fields=["product"],
+        update_fields=["payload", "total_quantity", "created_at", "updated_at"],
+    )
+    return len(entries)
+
+
+def refresh_stock(product_ids):
+    """
+    Copy the current inventory quantity onto the catalog entries.
+
+    Callers that change ProductInventory with queryset updates (which send
+    no signals) use this to keep catalog stock in step.
+    """
+    product_ids = set(product_ids)
+    if not product_ids:
+        return 0
+    quantity = ProductInventory.objects.filter(product=OuterRef("product")).values(
+        "quantity"
+    )
+    return ProductCatalogEntry.objects.filter(product_id__in=product_ids).update(
+        total_quantity=Coalesce(Subquery(quantity), 0), updated_at=Now()
+    )
+
+
+def rebuild(batch_size=500, stdout=None):
+    """Rebuild every catalog entry, `batch_size` products per upsert."""
+    total = 0
+    batch = []
+    for product_id in Product.objects.order_by("pk").values_list("pk", flat=True):
+        batch.append(product_id)
+        if len(batch) >= batch_size:
+            total += refresh_products(batch)
+            batch = []
+            if stdout is not None:
+                stdout.write(f"Refreshed {total} products")
+    total += refresh_products(batch)
+    return total
+
+
+def schedule_refresh(product_ids):
+    """
+    Refresh the given products once the current transaction commits.
+
+    Several signals fire for a single product write (the row, its
+    categories, each image), so ids are collected per thread and flushed
+    together by the first on_commit callback that runs.
+    """
+    pending = _pending_ids()
+    pending.update(product_ids)
+    transaction.on_commit(_flush_pending)
+
+
+def _pending_ids():
+    if not hasattr(_pending, "ids"):
+        _pending.ids = set()
+    return _pending.ids
+
+
+def _flush_pending():
+    pending = _pending_ids()
+    if not pending:
+        return
+    product_ids = set(pending)
+    pending.clear()
+    refresh_products(product_ids)
@@ -0,0 +1,112 @@
+from django.conf import settings
+from django.db.models import Count, Q
+from rest_framework.exceptions import ValidationError
+
+from products.models import Product
+
+TRUE_VALUES = ("1", "true", "yes")
+
+
+def parse_filters(query_params):
+    """
+    Read listing filters from the query string.
+
+    ?category=1,2      products in any of the categories
+    ?min_price=10      product_price >= 10
+    ?max_price=50      product_price <= 50
+    ?in_stock=true     inventory quantity > 0
+    """
+    filters = {}
+
+    raw_categories = ",".join(query_params.getlist("category"))
+    if raw_categories:
+        try:
+            filters["categories"] = sorted(
+                {int(value) for value in raw_categories.split(",") if value}
+            )
+        except ValueError:
+            raise ValidationError({"category": "Expected comma-separated ids."})
+
+    for name in ("min_price", "max_price"):
+        value = query_params.get(name)
+        if value in (None, ""):
+            continue
+        try:
+            filters[name] = int(value)
+        except ValueError:
+            raise ValidationError({name: "Expected an integer."})
+
+    if query_params.get("in_stock", "").lower() in TRUE_VALUES:
+        filters["in_stock"] = True
+
+    return filters
+
+
+def apply_filters(queryset, filters, exclude=()):
+    """
+    Filter a Product queryset. Facets pass `exclude` to leave out their own
+    dimension, so selecting a category doesn't zero the other categories.
+    """
+    if "categories" in filters and "categories" not in exclude:
+        # A subquery instead of a join keeps products in several of the
+        # selected categories from appearing twice.
+        through = Product.product_categories.through.objects.filter(
+            category_id__in=filters["categories"]
+        )
+        queryset = queryset.filter(pk__in=through.values("product_id"))
+    if "price" not in exclude:
+        if "min_price" in filters:
+            queryset = queryset.filter(product_price__gte=filters["min_price"])
+        if "max_price" in filters:
+            queryset = queryset.filter(product_price__lte=filters["max_price"])
+    if filters.get("in_stock"):
+        queryset = queryset.filter(inventory__quantity__gt=0)
+    return queryset
+
+
+def price_buckets():
+    """[(low, high), ...] with high exclusive and None for the open top."""
+    edges = [0] + list(settings.PRODUCT_PRICE_BUCKETS)
+    return list(zip(edges, edges[1:] + [None]))
+
+
+def facet_counts(filters):
+    """Category and price-bucket counts, one grouped query per dimension."""
+    category_rows = (
+        Product.product_categories.through.objects.filter(
+            product__in=apply_filters(
+                Product.objects.all(), filters, exclude=("categories",)
+            )
+        )
+        .values("category_id", "category__name")
+        .annotate(count=Count("product_id"))
+        .order_by("category__name")
+    )
+
+    buckets = price_buckets()
+    priced = apply_filters(Product.objects.all(), filters, exclude=("price",))
+    price_counts = priced.aggregate(
+        **{
+            f"bucket_{index}": Count(
+                "pk",
+                filter=Q(product_price__gte=low)
+                & (Q(product_price__lt=high) if high is not None else Q()),
+            )
+            for index, (low, high) in enumerate(buckets)
+        }
+    )
+
+    return {
+        "categories": [
+            {
+                "id": row["category_id"],
+                "name": row["category__name"],
+                "count": row["count"],
+            }
+            for row in category_rows
+        ],
+        "price": [
+            {"min": low, "max": high, "count": price_counts[f"bucket_{index}"]}
+            for index, (low, high) in enumerate(buckets)
+        ],
+    }
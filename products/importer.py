@@ -0,0 +1,200 @@
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from rest_framework.exceptions import ValidationError
+
+from category import counts
+from category.models import Category
+from products import catalog, ledger, search
+from products.models import Product, ProductImage, ProductInventory
+
+FORMATS = ("csv", "jsonl")
+
+# CSV cells can't hold lists, so categories and images are "|"-separated.
+CSV_LIST_SEPARATOR = "|"
+CSV_LIST_FIELDS = ("categories", "images")
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    errors: list = field(default_factory=list)
+
+    @property
+    def failed(self):
+        return len(self.errors)
+
+    def as_dict(self):
+        return {"created": self.created, "failed": self.failed, "errors": self.errors}
+
+
+def detect_format(filename, default=None):
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    return default
+
+
+def read_rows(stream, fmt):
+    """
+    Yield (row_number, row) from a binary stream without reading it whole.
+    Rows that can't be parsed are yielded as (row_number, ValueError).
+    """
+    if fmt == "csv":
+        yield from read_csv_rows(io.TextIOWrapper(stream, encoding="utf-8", newline=""))
+    elif fmt == "jsonl":
+        for row_number, line in enumerate(stream, start=1):
+            try:
+                line = line.decode("utf-8")
+            except UnicodeDecodeError as error:
+                yield row_number, ValueError(f"Not valid UTF-8 text ({error.reason}).")
+                continue
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+                if not isinstance(row, dict):
+                    raise ValueError("Expected a JSON object.")
+            except ValueError as error:
+                yield row_number, ValueError(str(error))
+                continue
+            yield row_number, row
+    else:
+        raise ValueError(f"Unsupported format {fmt!r}; expected one of {FORMATS}.")
+
+
+def read_csv_rows(text):
+    reader = csv.DictReader(text)
+    # Row 1 is the header.
+    row_number = 1
+    while True:
+        row_number += 1
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as error:
+            yield row_number, ValueError(f"Malformed CSV: {error}.")
+            continue
+        except UnicodeDecodeError as error:
+            # The decoder can't find the next row boundary after bad bytes.
+            yield row_number, ValueError(
+                f"Not valid UTF-8 text at or after this row ({error.reason}); "
+                "the rest of the file was skipped."
+            )
+            return
+
+        # Empty cells mean "not given", so serializer defaults apply.
+        row = {name: value for name, value in row.items() if value not in ("", None)}
+        for name in CSV_LIST_FIELDS:
+            if name in row:
+                row[name] = [
+                    value.strip()
+                    for value in row[name].split(CSV_LIST_SEPARATOR)
+                    if value.strip()
+                ]
+        yield row_number, row
+
+
+def import_products(rows, chunk_size=500, on_chunk=None):
+    """
+    Validate and insert (row_number, row) pairs in chunks of `chunk_size`.
+
+    Each valid chunk is written with one bulk insert per table, inside its
+    own transaction, so memory stays bounded by the chunk size and a bad
+    row never aborts the rest of the file.
+    """
+    from products.serializers import ProductImportRowSerializer
+
+    result = ImportResult()
+    category_ids = set(Category.objects.values_list("pk", flat=True))
+    # One serializer instance is reused for every row so its fields are
+    # only built once.
+    validator = ProductImportRowSerializer(context={"category_ids": category_ids})
+    rows = iter(rows)
+
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+
+        valid = []
+        for row_number, row in chunk:
+            if isinstance(row, Exception):
+                result.errors.append({"row": row_number, "errors": str(row)})
+                continue
+            try:
+                valid.append(validator.run_validation(row))
+            except ValidationError as error:
+                result.errors.append({"row": row_number, "errors": error.detail})
+
+        result.created += write_chunk(valid)
+        if on_chunk is not None:
+            on_chunk(result)
+
+    return result
+
+
+@transaction.atomic
+def write_chunk(rows):
+    if not rows:
+        return 0
+
+    products = Product.objects.bulk_create(
+        [
+            Product(
+                product_name=row["product_name"],
+                product_description=row["product_description"],
+                product_price=row["product_price"],
+            )
+            for row in rows
+        ]
+    )
+
+    images = [
+        ProductImage(product=product, image=url)
+        for product, row in zip(products, rows)
+        for url in row.get("images", [])
+    ]
+    ProductImage.objects.bulk_create(images)
+
+    # The first image of each row becomes the primary one, set for the
+    # whole chunk in one UPDATE rather than a CASE per product.
+    first_image = ProductImage.objects.filter(product=OuterRef("pk")).order_by("pk")
+    Product.objects.filter(pk__in={image.product_id for image in images}).update(
+        product_primary_image=Subquery(first_image.values("pk")[:1])
+    )
+
+    through = Product.product_categories.through
+    through.objects.bulk_create(
+        [
+            through(product_id=product.pk, category_id=category_id)
+            for product, row in zip(products, rows)
+            for category_id in row.get("categories", [])
+        ]
+    )
+
+    inventory = ProductInventory.objects.bulk_create(
+        [
+            ProductInventory(product=product, quantity=row["quantity"])
+            for product, row in zip(products, rows)
+            if row.get("quantity") is not None
+        ]
+    )
+    ledger.record(
+        {item.product_id: item.quantity for item in inventory}, ledger.Reason.IMPORT
+    )
+
+    # bulk_create sends no signals; bring the read side along explicitly.
+    product_ids = [product.pk for product in products]
+    catalog.refresh_products(product_ids)
+    search.index_products(product_ids)
+    counts.invalidate()
+    return len(products)
@@ -0,0 +1,166 @@
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (Case, F, FloatField, IntegerField, Sum, Value,
+                              When)
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from products.models import ProductSalesDaily
+
+
+def record_sales(units):
+    """Add today's {product_id: units sold} to the rollup."""
+    _increment("units_sold", units)
+
+
+def record_cart_add(product_id):
+    """Count one add-to-cart of a product today."""
+    record_cart_adds({product_id: 1})
+
+
+def record_cart_adds(counts):
+    """Add today's {product_id: add-to-cart events} to the rollup."""
+    _increment("cart_adds", counts)
+
+
+@transaction.atomic
+def _increment(field, amounts, day=None):
+    # One upsert so today's rows exist, then one UPDATE adding to each.
+    amounts = {product_id: amount for product_id, amount in amounts.items() if amount}
+    if not amounts:
+        return
+    day = day or timezone.localdate()
+    ProductSalesDaily.objects.bulk_create(
+        [ProductSalesDaily(product_id=product_id, day=day) for product_id in amounts],
+        ignore_conflicts=True,
+    )
+    ProductSalesDaily.objects.filter(day=day, product_id__in=amounts).update(
+        **{
+            field: F(field)
+            + Case(
+                *[
+                    When(product_id=product_id, then=Value(amount))
+                    for product_id, amount in amounts.items()
+                ],
+                output_field=IntegerField(),
+            )
+        }
+    )
+
+
+@transaction.atomic
+def rebuild_sales(items, since=None):
+    """
+    Recompute units_sold from `items`, an OrderItems queryset, for every day
+    from `since` (or all days); returns the number of rows written.
+    cart_adds only exist in the rollup and are left alone.
+    """
+    rows = items.annotate(day=TruncDate("order__order_date"))
+    existing = ProductSalesDaily.objects.all()
+    if since is not None:
+        rows = rows.filter(day__gte=since)
+        existing = existing.filter(day__gte=since)
+    rows = rows.values("product_id", "day").annotate(units=Sum("quantity")).order_by()
+
+    existing.exclude(units_sold=0).update(units_sold=0)
+    written = ProductSalesDaily.objects.bulk_create(
+        [
+            ProductSalesDaily(
+                product_id=row["product_id"], day=row["day"], units_sold=row["units"]
+            )
+            for row in rows.iterator()
+        ],
+        update_conflicts=True,
+        unique_fields=["product", "day"],
+        update_fields=["units_sold"],
+        batch_size=1000,
+    )
+    return len(written)
+
+
+def top_sellers(limit, days=None):
+    """[(product_id, units sold)] over the last `days` days, best first."""
+    days = days or settings.LEADERBOARD_TOP_DAYS
+    since = timezone.localdate() - timedelta(days=days - 1)
+    rows = (
+        ProductSalesDaily.objects.filter(day__gte=since, units_sold__gt=0)
+        .values("product_id")
+        .annotate(score=Sum("units_sold"))
+        .order_by("-score", "product_id")
+        .values_list("product_id", "score")[:limit]
+    )
+    return list(rows)
+
+
+def trending(limit, days=None, half_life=None):
+    """
+    [(product_id, score)] by add-to-cart events, each day's count weighted
+    by 0.5 ** (age in days / half_life), hottest first.
+    """
+    days = days or settings.LEADERBOARD_TRENDING_DAYS
+    half_life = half_life or settings.LEADERBOARD_TRENDING_HALF_LIFE_DAYS
+    today = timezone.localdate()
+    weight = Case(
+        *[
+            When(day=today - timedelta(days=age), then=Value(0.5 ** (age / half_life)))
+            for age in range(days)
+        ],
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+    rows = (
+        ProductSalesDaily.objects.filter(
+            day__gte=today - timedelta(days=days - 1), cart_adds__gt=0
+        )
+        .values("product_id")
+        .annotate(score=Sum(F("cart_adds") * weight, output_field=FloatField()))
+        .order_by("-score", "product_id")
+        .values_list("product_id", "score")[:limit]
+    )
+    return [(product_id, round(score, 3)) for product_id, score in rows]
+
+
+class Leaderboard:
+    """
+    A fixed-size top-K list kept in memory by each worker process.
+
+    The first read after `interval` seconds recomputes it from the rollup
+    with one grouped query over the window's rows; every other read is a
+    list slice. Readers never wait on each other: while one thread
+    refreshes, the rest keep serving the previous list.
+    """
+
+    def __init__(self, compute, size=None, interval=None):
+        self.compute = compute
+        self.size = size
+        self.interval = interval
+        self.entries = None
+        self.refreshed_at = None
+        self.lock = threading.Lock()
+
+    def top(self, limit):
+        if self.entries is None or self.stale():
+            self.refresh(blocking=self.entries is None)
+        return self.entries[:limit]
+
+    def stale(self):
+        interval = self.interval or settings.LEADERBOARD_REFRESH_SECONDS
+        return time.monotonic() - self.refreshed_at >= interval
+
+    def refresh(self, blocking=True):
+        if not self.lock.acquire(blocking=blocking):
+            return
+        try:
+            if self.entries is None or self.stale():
+                self.entries = self.compute(self.size or settings.LEADERBOARD_SIZE)
+                self.refreshed_at = time.monotonic()
+        finally:
+            self.lock.release()
+
+
+TOP_SELLERS = Leaderboard(top_sellers)
+TRENDING = Leaderboard(trending)
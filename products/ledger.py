@@ -0,0 +1,91 @@
+from django.db import transaction
+from django.db.models import F, OuterRef, Q, Subquery, Sum
+
+from products.models import StockMovement, StockSnapshot
+
+Reason = StockMovement.Reason
+
+
+def record(deltas, reason, reference=""):
+    """
+    Append {product_id: delta} to the ledger in one INSERT.
+
+    Call it inside the transaction that changes the inventory, so a rolled
+    back change leaves no movement behind.
+    """
+    return StockMovement.objects.bulk_create(
+        [
+            StockMovement(
+                product_id=product_id,
+                delta=delta,
+                reason=reason,
+                reference=reference,
+            )
+            for product_id, delta in deltas.items()
+            if delta
+        ]
+    )
+
+
+def stock_at(product_id, at):
+    """
+    Stock of a product at time `at`: the newest snapshot taken at or before
+    `at` plus the movements after it. Both lookups are index range scans, so
+    the cost depends on the movements since the last compaction, not on the
+    size of the ledger.
+    """
+    snapshot = (
+        StockSnapshot.objects.filter(product_id=product_id, as_of__lte=at)
+        .order_by("-as_of")
+        .values_list("as_of", "quantity")
+        .first()
+    )
+    movements = StockMovement.objects.filter(product_id=product_id, created_at__lte=at)
+    base = 0
+    if snapshot is not None:
+        as_of, base = snapshot
+        movements = movements.filter(created_at__gt=as_of)
+    return base + (movements.aggregate(total=Sum("delta"))["total"] or 0)
+
+
+def compact(before, prune=False, batch_size=1000):
+    """
+    Fold movements made up to `before` into one StockSnapshot per product.
+
+    Each product's new snapshot is its previous one plus the sum of the
+    movements since, computed in one grouped query. With `prune` the folded
+    movements are deleted afterwards; history before `before` then stays
+    answerable at snapshot granularity only.
+
+    Returns the number of snapshots written.
+    """
+    latest = StockSnapshot.objects.filter(
+        product=OuterRef("product"), as_of__lte=before
+    ).order_by("-as_of")
+
+    with transaction.atomic():
+        folded = (
+            StockMovement.objects.filter(created_at__lte=before)
+            .alias(snapshot_at=Subquery(latest.values("as_of")[:1]))
+            .filter(Q(snapshot_at__isnull=True) | Q(created_at__gt=F("snapshot_at")))
+            .values("product")
+            .annotate(
+                total=Sum("delta"),
+                base=Subquery(latest.values("quantity")[:1]),
+            )
+            .values_list("product", "total", "base")
+        )
+        written = StockSnapshot.objects.bulk_create(
+            (
+                StockSnapshot(
+                    product_id=product_id, as_of=before, quantity=(base or 0) + total
+                )
+                for product_id, total, base in folded.iterator()
+            ),
+            batch_size=batch_size,
+        )
+
+        if prune:
+            StockMovement.objects.filter(created_at__lte=before).delete()
+
+    return len(written)
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from plans.models import Post
+from products.models import ProductImage
+from utils import derivatives
+
+MODELS = {
+    "products": ProductImage.objects.all,
+    "posts": lambda: Post.objects.exclude(image=""),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate thumbnail, medium and WebP renditions for existing product "
+        "and post images."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model", choices=[*MODELS, "all"], default="all", dest="model_name"
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            dest="regenerate",
+            help="Regenerate images that already have renditions.",
+        )
+        parser.add_argument("--batch-size", type=int, default=100)
+
+    def handle(self, *args, **options):
+        names = (
+            list(MODELS) if options["model_name"] == "all" else [options["model_name"]]
+        )
+        for name in names:
+            queryset = MODELS[name]().exclude(image__isnull=True)
+            if not options["regenerate"]:
+                queryset = queryset.filter(derivatives={})
+            total = derivatives.backfill(
+                queryset, batch_size=options["batch_size"], stdout=self.stdout
+            )
+            self.stdout.write(
+                self.style.SUCCESS(f"Generated renditions for {total} {name} images.")
+            )
@@ -0,0 +1,144 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from products import search
+from products.models import Product
+
+VOCABULARY = [
+    "whey",
+    "protein",
+    "creatine",
+    "vegan",
+    "isolate",
+    "casein",
+    "chocolate",
+    "vanilla",
+    "strawberry",
+    "bar",
+    "shaker",
+    "gloves",
+    "belt",
+    "kettlebell",
+    "dumbbell",
+    "resistance",
+    "band",
+    "yoga",
+    "mat",
+    "foam",
+    "roller",
+    "omega",
+    "vitamin",
+    "multivitamin",
+    "electrolyte",
+    "preworkout",
+    "recovery",
+    "bcaa",
+    "glutamine",
+    "collagen",
+    "oats",
+    "peanut",
+    "butter",
+    "keto",
+    "snack",
+    "hydration",
+    "bottle",
+    "towel",
+    "rope",
+    "jump",
+    "bench",
+    "plate",
+    "barbell",
+    "grip",
+    "chalk",
+    "straps",
+    "knee",
+    "sleeve",
+    "wrist",
+    "wrap",
+    "hoodie",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure product search latency, optionally seeding a synthetic "
+        "catalog first. Seeded products are written to the configured "
+        "database and deleted again afterwards; never run --generate "
+        "against production."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--generate",
+            type=int,
+            default=0,
+            help="Number of synthetic products to create before measuring.",
+        )
+        parser.add_argument("--queries", type=int, default=200)
+        parser.add_argument("--page-size", type=int, default=20)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+
+        generated = []
+        try:
+            if options["generate"]:
+                self.generate(
+                    rng, options["generate"], options["batch_size"], generated
+                )
+                started = time.perf_counter()
+                search.rebuild()
+                self.stdout.write(
+                    f"Rebuilt index in {time.perf_counter() - started:.1f}s"
+                )
+            self.measure(rng, options["queries"], options["page_size"])
+        finally:
+            for start in range(0, len(generated), options["batch_size"]):
+                batch = generated[start : start + options["batch_size"]]
+                # post_delete drops them from the search index as well.
+                Product.objects.filter(pk__in=batch).delete()
+
+    def measure(self, rng, queries, page_size):
+        timings = []
+        for _ in range(queries):
+            query = " ".join(rng.sample(VOCABULARY, rng.choice([1, 1, 2])))
+            started = time.perf_counter()
+            hits = search.search(query, page_size + 1)
+            if len(hits) > page_size:
+                # Follow one cursor as well, since clients page.
+                last = hits[page_size - 1]
+                search.search(query, page_size + 1, (last.rank, last.pk))
+            timings.append((time.perf_counter() - started) * 1000)
+
+        timings.sort()
+        quantiles = statistics.quantiles(timings, n=100)
+        self.stdout.write(
+            f"{Product.objects.count()} products, {len(timings)} queries: "
+            f"p50={quantiles[49]:.1f}ms p95={quantiles[94]:.1f}ms "
+            f"p99={quantiles[98]:.1f}ms max={timings[-1]:.1f}ms"
+        )
+
+    def generate(self, rng, count, batch_size, created):
+        """Create `count` products, adding their ids to `created` as it goes."""
+        while len(created) < count:
+            size = min(batch_size, count - len(created))
+            products = [
+                Product(
+                    product_name=" ".join(rng.sample(VOCABULARY, 3)).title(),
+                    product_description=" ".join(
+                        rng.choice(VOCABULARY) for _ in range(40)
+                    ),
+                    product_price=rng.randint(5, 300),
+                )
+                for _ in range(size)
+            ]
+            with transaction.atomic():
+                Product.objects.bulk_create(products, batch_size=1000)
+            created += [product.pk for product in products]
+            self.stdout.write(f"Created {len(created)}/{count} products")
@@ -0,0 +1,88 @@
+import io
+import random
+import tempfile
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from utils.upload_files import LocalBackend, UploadPipeline
+
+
+class SlowBackend(LocalBackend):
+    """LocalBackend with a fixed delay per upload, to stand in for the network."""
+
+    def __init__(self, latency, **kwargs):
+        super().__init__(**kwargs)
+        self.latency = latency
+
+    def upload(self, *args, **kwargs):
+        time.sleep(self.latency)
+        return super().upload(*args, **kwargs)
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the image upload pipeline offline against the local backend, "
+        "sequentially and on the thread pool. Files are written to a "
+        "temporary directory."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--images", type=int, default=64)
+        parser.add_argument(
+            "--duplicates",
+            type=float,
+            default=0.25,
+            help="Share of images that repeat an earlier one.",
+        )
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0.2,
+            help="Simulated seconds per upload.",
+        )
+        parser.add_argument("--workers", type=int, default=8)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        images = []
+        for _ in range(options["images"]):
+            if images and rng.random() < options["duplicates"]:
+                images.append(rng.choice(images))
+            else:
+                images.append(self.make_image(rng))
+        unique = len(set(images))
+
+        with tempfile.TemporaryDirectory() as location:
+            backend = SlowBackend(options["latency"], location=location)
+            for workers in (1, options["workers"]):
+                # A fresh folder per run keeps earlier runs out of the cache.
+                folder = f"benchmark-{uuid.uuid4().hex}"
+                pipeline = UploadPipeline(backend=backend, max_workers=workers)
+                started = time.perf_counter()
+                urls = pipeline.upload_many(images, folder=folder)
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"{workers} workers: {len(urls)} images ({unique} unique) "
+                    f"in {elapsed:.2f}s ({len(urls) / elapsed:.1f}/s)"
+                )
+
+                started = time.perf_counter()
+                pipeline.upload_many(images, folder=folder)
+                self.stdout.write(
+                    f"  repeat upload served from cache in "
+                    f"{(time.perf_counter() - started) * 1000:.1f}ms"
+                )
+
+    def make_image(self, rng):
+        image = Image.new("RGB", (640, 480), tuple(rng.randrange(256) for _ in "rgb"))
+        for _ in range(20):
+            x, y = rng.randrange(600), rng.randrange(440)
+            colour = tuple(rng.randrange(256) for _ in "rgb")
+            image.paste(colour, (x, y, x + 40, y + 40))
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=85)
+        return buffer.getvalue()
@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from products import ledger
+
+
+class Command(BaseCommand):
+    help = (
+        "Fold stock movements older than --older-than-days into per-product "
+        "snapshots, optionally deleting the folded movements."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--older-than-days", type=int, default=30)
+        parser.add_argument(
+            "--prune",
+            action="store_true",
+            help="Delete movements once they are folded into a snapshot.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=options["older_than_days"])
+        total = ledger.compact(
+            before, prune=options["prune"], batch_size=options["batch_size"]
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Wrote {total} stock snapshots as of {before}.")
+        )
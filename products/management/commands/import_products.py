@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from products import importer
+
+
+class Command(BaseCommand):
+    help = "Import products from a CSV or JSONL file in bulk."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import.")
+        parser.add_argument(
+            "--format",
+            choices=importer.FORMATS,
+            help="Defaults to the file extension (.csv, .jsonl or .ndjson).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Rows validated and inserted per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        fmt = options["format"] or importer.detect_format(options["path"])
+        if fmt is None:
+            raise CommandError("Could not tell the format; pass --format.")
+
+        def report(result):
+            self.stdout.write(f"{result.created} created, {result.failed} failed")
+
+        with open(options["path"], "rb") as stream:
+            result = importer.import_products(
+                importer.read_rows(stream, fmt),
+                chunk_size=options["chunk_size"],
+                on_chunk=report,
+            )
+
+        for error in result.errors:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {result.created} products, {result.failed} rows failed."
+            )
+        )
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from products import catalog
+
+
+class Command(BaseCommand):
+    help = "Rebuild the denormalized product catalog table from scratch."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of products flattened per upsert.",
+        )
+
+    def handle(self, *args, **options):
+        total = catalog.rebuild(batch_size=options["batch_size"], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {total} catalog entries."))
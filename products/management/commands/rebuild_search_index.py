@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from products import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the product full-text search index."
+
+    def handle(self, *args, **options):
+        total = search.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} products."))
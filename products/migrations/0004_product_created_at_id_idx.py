@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("category", "0001_initial"),
+        ("products", "0003_product_product_primary_image"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="product_created_at_id_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0004_product_created_at_id_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductCatalogEntry",
+            fields=[
+                (
+                    "product",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="catalog_entry",
+                        serialize=False,
+                        to="products.product",
+                    ),
+                ),
+                ("payload", models.JSONField()),
+                ("total_quantity", models.IntegerField(default=0)),
+                ("created_at", models.DateTimeField()),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["-created_at", "-product"],
+                        name="catalog_created_at_id_idx",
+                    )
+                ],
+            },
+        ),
+    ]
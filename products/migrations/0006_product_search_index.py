@@ -0,0 +1,50 @@
+from django.db import migrations
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE products_product ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(product_name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(product_description, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX product_search_vector_idx ON products_product "
+    "USING GIN (search_vector)",
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS product_search_vector_idx",
+    "ALTER TABLE products_product DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE products_product_fts "
+    "USING fts5(product_name, product_description)",
+    "INSERT INTO products_product_fts (rowid, product_name, product_description) "
+    "SELECT id, product_name, product_description FROM products_product",
+]
+SQLITE_BACKWARD = ["DROP TABLE IF EXISTS products_product_fts"]
+
+
+def run_for_vendor(postgres, sqlite):
+    def run(apps, schema_editor):
+        statements = {"postgresql": postgres, "sqlite": sqlite}.get(
+            schema_editor.connection.vendor, []
+        )
+        for statement in statements:
+            schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0005_productcatalogentry"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_for_vendor(POSTGRES_FORWARD, SQLITE_FORWARD),
+            run_for_vendor(POSTGRES_BACKWARD, SQLITE_BACKWARD),
+        ),
+    ]
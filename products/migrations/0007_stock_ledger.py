@@ -0,0 +1,112 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def snapshot_existing_stock(apps, schema_editor):
+    # Stock that predates the ledger becomes each product's opening snapshot.
+    ProductInventory = apps.get_model("products", "ProductInventory")
+    StockSnapshot = apps.get_model("products", "StockSnapshot")
+    as_of = timezone.now()
+    StockSnapshot.objects.bulk_create(
+        (
+            StockSnapshot(product_id=product_id, as_of=as_of, quantity=quantity)
+            for product_id, quantity in ProductInventory.objects.values_list(
+                "product_id", "quantity"
+            ).iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0006_product_search_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StockMovement",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("delta", models.IntegerField()),
+                (
+                    "reason",
+                    models.CharField(
+                        choices=[
+                            ("restock", "Restock"),
+                            ("adjustment", "Adjustment"),
+                            ("import", "Import"),
+                            ("cart_reserve", "Cart reserve"),
+                            ("cart_release", "Cart release"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("reference", models.CharField(blank=True, max_length=64)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stock_movements",
+                        to="products.product",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["product", "created_at"],
+                        name="stock_movement_product_at_idx",
+                    ),
+                    models.Index(
+                        fields=["created_at"], name="stock_movement_created_at_idx"
+                    ),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="StockSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("as_of", models.DateTimeField()),
+                ("quantity", models.IntegerField()),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stock_snapshots",
+                        to="products.product",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("product", "as_of"), name="stock_snapshot_product_as_of"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(snapshot_existing_stock, migrations.RunPython.noop),
+    ]
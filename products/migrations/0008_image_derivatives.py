@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0007_stock_ledger"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="productimage",
+            name="derivatives",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0008_image_derivatives"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductRating",
+            fields=[
+                (
+                    "product",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="rating",
+                        serialize=False,
+                        to="products.product",
+                    ),
+                ),
+                ("count", models.PositiveIntegerField(default=0)),
+                ("total", models.PositiveIntegerField(default=0)),
+                ("star_1", models.PositiveIntegerField(default=0)),
+                ("star_2", models.PositiveIntegerField(default=0)),
+                ("star_3", models.PositiveIntegerField(default=0)),
+                ("star_4", models.PositiveIntegerField(default=0)),
+                ("star_5", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
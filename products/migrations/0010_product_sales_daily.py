@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0009_product_rating"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductSalesDaily",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("units_sold", models.PositiveIntegerField(default=0)),
+                ("cart_adds", models.PositiveIntegerField(default=0)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="sales_daily",
+                        to="products.product",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["day"], name="product_sales_daily_day_idx")
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("product", "day"), name="product_sales_daily_unique"
+                    )
+                ],
+            },
+        ),
+    ]
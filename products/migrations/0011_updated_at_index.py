@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("category", "0002_updated_at_index"),
+        ("products", "0010_product_sales_daily"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(fields=["updated_at"], name="product_updated_at_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="productcatalogentry",
+            index=models.Index(fields=["updated_at"], name="catalog_updated_at_idx"),
+        ),
+    ]
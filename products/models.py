@@ -1,8 +1,20 @@
 from django.db import models
+from django.db.models.functions import Coalesce
 
 from category.models import Category
 
 
+class ProductQuerySet(models.QuerySet):
+    def for_listing(self):
+        # Everything GetProductSerializer touches: stock and rating come from
+        # joins on one-to-one rows, relations from two prefetch queries.
+        return (
+            self.select_related("product_primary_image", "rating")
+            .prefetch_related("product_categories", "images")
+            .annotate(stock_quantity=Coalesce("inventory__quantity", 0))
+        )
+
+
 class Product(models.Model):
 
     product_name = models.CharField(
@@ -22,12 +34,23 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["-created_at", "-id"], name="product_created_at_id_idx"
+            ),
+            models.Index(fields=["updated_at"], name="product_updated_at_idx"),
+        ]
+
 
 class ProductImage(models.Model):
     product = models.ForeignKey(
         Product, related_name="images", on_delete=models.CASCADE
     )
     image = models.URLField()
+    derivatives = models.JSONField(default=dict, blank=True)  # {size: URL}
     created_at = models.DateTimeField(auto_now_add=True)
 
 
@@ -37,3 +60,128 @@ class ProductInventory(models.Model):
     )
     quantity = models.PositiveIntegerField()
     updated_at = models.DateTimeField(auto_now=True)
+
+
+class ProductRating(models.Model):
+    """
+    Running totals of a product's review ratings, incremented by
+    products.ratings as reviews are written.
+    """
+
+    product = models.OneToOneField(
+        Product, primary_key=True, related_name="rating", on_delete=models.CASCADE
+    )
+    count = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    star_1 = models.PositiveIntegerField(default=0)
+    star_2 = models.PositiveIntegerField(default=0)
+    star_3 = models.PositiveIntegerField(default=0)
+    star_4 = models.PositiveIntegerField(default=0)
+    star_5 = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def average(self):
+        return round(self.total / self.count, 2) if self.count else None
+
+    @property
+    def histogram(self):
+        return {stars: getattr(self, f"star_{stars}") for stars in range(1, 6)}
+
+
+class ProductSalesDaily(models.Model):
+    """Per-product, per-day counters behind the top and trending lists."""
+
+    product = models.ForeignKey(
+        Product, related_name="sales_daily", on_delete=models.CASCADE
+    )
+    day = models.DateField()
+    units_sold = models.PositiveIntegerField(default=0)
+    cart_adds = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "day"], name="product_sales_daily_unique"
+            ),
+        ]
+        indexes = [models.Index(fields=["day"], name="product_sales_daily_day_idx")]
+
+
+class ProductCatalogEntry(models.Model):
+    """
+    Flattened, read-only copy of a product as GetProductSerializer renders it.
+
+    Maintained row by row from signals (see products.signals) and rebuilt in
+    bulk by the rebuild_product_catalog command. Stock lives in its own
+    column so inventory changes don't rewrite the payload.
+    """
+
+    product = models.OneToOneField(
+        Product,
+        primary_key=True,
+        related_name="catalog_entry",
+        on_delete=models.CASCADE,
+    )
+    payload = models.JSONField()
+    total_quantity = models.IntegerField(default=0)
+    created_at = models.DateTimeField()  # Copied from the product for ordering
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["-created_at", "-product"], name="catalog_created_at_id_idx"
+            ),
+            models.Index(fields=["updated_at"], name="catalog_updated_at_idx"),
+        ]
+
+
+class StockMovement(models.Model):
+    """
+    Append-only record of every change to ProductInventory.quantity.
+
+    Written in the same transaction as the change itself (see products.stock),
+    so the ledger and the inventory row always agree. Old movements are
+    folded into StockSnapshot rows by the compact_stock_ledger command.
+    """
+
+    class Reason(models.TextChoices):
+        RESTOCK = "restock", "Restock"
+        ADJUSTMENT = "adjustment", "Adjustment"
+        IMPORT = "import", "Import"
+        CART_RESERVE = "cart_reserve", "Cart reserve"
+        CART_RELEASE = "cart_release", "Cart release"
+
+    product = models.ForeignKey(
+        Product, related_name="stock_movements", on_delete=models.CASCADE
+    )
+    delta = models.IntegerField()
+    reason = models.CharField(max_length=20, choices=Reason.choices)
+    reference = models.CharField(max_length=64, blank=True)  # e.g. "cart:12"
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["product", "created_at"], name="stock_movement_product_at_idx"
+            ),
+            models.Index(fields=["created_at"], name="stock_movement_created_at_idx"),
+        ]
+
+
+class StockSnapshot(models.Model):
+    """Stock of a product as of a point in time, after compaction."""
+
+    product = models.ForeignKey(
+        Product, related_name="stock_snapshots", on_delete=models.CASCADE
+    )
+    as_of = models.DateTimeField()
+    quantity = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "as_of"], name="stock_snapshot_product_as_of"
+            ),
+        ]
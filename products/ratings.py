@@ -0,0 +1,70 @@
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Now
+
+from products import catalog
+from products.models import ProductRating
+
+STARS = range(1, 6)
+FIELDS = ["count", "total", *(f"star_{stars}" for stars in STARS)]
+
+
+@transaction.atomic
+def add(product_id, rating):
+    """Count one `rating`-star review of a product."""
+    ProductRating.objects.bulk_create(
+        [ProductRating(product_id=product_id)], ignore_conflicts=True
+    )
+    ProductRating.objects.filter(product_id=product_id).update(
+        count=F("count") + 1,
+        total=F("total") + rating,
+        updated_at=Now(),
+        **{f"star_{rating}": F(f"star_{rating}") + 1},
+    )
+    catalog.schedule_refresh([product_id])
+
+
+def differences(reviews):
+    """
+    {product_id: (stored, expected)} for every product whose stored totals
+    don't match `reviews`, a Review queryset aggregated in one grouped query.
+    """
+    rows = (
+        reviews.values("order_item__product_id")
+        .annotate(
+            count=Count("pk"),
+            total=Sum("rating"),
+            **{f"star_{stars}": Count("pk", filter=Q(rating=stars)) for stars in STARS},
+        )
+        .order_by()
+    )
+    expected = {
+        row["order_item__product_id"]: ProductRating(
+            product_id=row.pop("order_item__product_id"), **row
+        )
+        for row in rows
+    }
+    stored = {rating.product_id: rating for rating in ProductRating.objects.all()}
+
+    drifted = {}
+    for product_id in expected.keys() | stored.keys():
+        have = stored.get(product_id) or ProductRating(product_id=product_id)
+        want = expected.get(product_id) or ProductRating(product_id=product_id)
+        if any(getattr(have, name) != getattr(want, name) for name in FIELDS):
+            drifted[product_id] = (have, want)
+    return drifted
+
+
+@transaction.atomic
+def rebuild(reviews):
+    """Correct every drifted ProductRating; returns how many were wrong."""
+    drifted = differences(reviews)
+    ProductRating.objects.bulk_create(
+        [want for _, want in drifted.values()],
+        update_conflicts=True,
+        unique_fields=["product"],
+        update_fields=[*FIELDS, "updated_at"],
+        batch_size=1000,
+    )
+    catalog.schedule_refresh(drifted)
+    return len(drifted)
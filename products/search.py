@@ -0,0 +1,214 @@
+import re
+from collections import namedtuple
+
+from django.db import connection
+from django.db.models import Q
+
+from products.models import Product
+
+SearchHit = namedtuple("SearchHit", ["pk", "rank", "highlight"])
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+
+# Kept in step with the DDL in migration 0006_product_search_index.
+SQLITE_INDEX_TABLE = "products_product_fts"
+
+
+class PostgresSearchBackend:
+    """
+    Ranked search over the generated `search_vector` column.
+
+    The column and its GIN index are maintained by Postgres itself, so the
+    index hooks are no-ops.
+    """
+
+    def search(self, query, limit, after=None):
+        rank = "ts_rank_cd(p.search_vector, q.query)::float8"
+        params = [query]
+        seek = ""
+        if after is not None:
+            seek = f"AND ({rank} < %s OR ({rank} = %s AND p.id < %s))"
+            params += [after[0], after[0], after[1]]
+        params += [limit, query]
+        sql = f"""
+            SELECT page.id, page.rank, ts_headline(
+                'english', page.product_description, q.query,
+                'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, MaxFragments=2, MaxWords=20, MinWords=5'
+            )
+            FROM (
+                SELECT p.id, p.product_description, {rank} AS rank
+                FROM products_product p,
+                     websearch_to_tsquery('english', %s) AS q(query)
+                WHERE p.search_vector @@ q.query {seek}
+                ORDER BY rank DESC, p.id DESC
+                LIMIT %s
+            ) page, websearch_to_tsquery('english', %s) AS q(query)
+            ORDER BY page.rank DESC, page.id DESC
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [SearchHit(*row) for row in cursor.fetchall()]
+
+    def index_products(self, product_ids):
+        pass
+
+    def remove_products(self, product_ids):
+        pass
+
+    def rebuild(self):
+        return Product.objects.count()
+
+
+class SQLiteSearchBackend:
+    """
+    FTS5 fallback for local development and tests.
+
+    The FTS table keeps its own copy of the text, keyed by product id, and
+    has to be refreshed explicitly whenever products are written.
+    """
+
+    def search(self, query, limit, after=None):
+        match = self.match_expression(query)
+        if not match:
+            return []
+        # bm25() is lower-is-better; negate it so both backends sort by
+        # rank descending. Name hits weigh ten times description hits.
+        rank = f"-bm25({SQLITE_INDEX_TABLE}, 10.0, 1.0)"
+        params = [match]
+        seek = ""
+        if after is not None:
+            seek = f"AND ({rank} < %s OR ({rank} = %s AND rowid < %s))"
+            params += [after[0], after[0], after[1]]
+        params.append(limit)
+        sql = f"""
+            SELECT rowid, {rank} AS score, snippet(
+                {SQLITE_INDEX_TABLE}, 1, '{HIGHLIGHT_START}', '{HIGHLIGHT_STOP}', '…', 20
+            )
+            FROM {SQLITE_INDEX_TABLE}
+            WHERE {SQLITE_INDEX_TABLE} MATCH %s {seek}
+            ORDER BY score DESC, rowid DESC
+            LIMIT %s
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [SearchHit(*row) for row in cursor.fetchall()]
+
+    @staticmethod
+    def match_expression(query):
+        # Quote every term so user input can never be parsed as FTS5 syntax.
+        terms = re.findall(r"\w+", query)
+        return " ".join(f'"{term}"' for term in terms)
+
+    def index_products(self, product_ids):
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        rows = Product.objects.filter(pk__in=product_ids).values_list(
+            "pk", "product_name", "product_description"
+        )
+        self.remove_products(product_ids)
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {SQLITE_INDEX_TABLE} "
+                "(rowid, product_name, product_description) VALUES (%s, %s, %s)",
+                list(rows),
+            )
+
+    def remove_products(self, product_ids):
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        placeholders = ", ".join(["%s"] * len(product_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {SQLITE_INDEX_TABLE} WHERE rowid IN ({placeholders})",
+                product_ids,
+            )
+
+    def rebuild(self, batch_size=1000):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SQLITE_INDEX_TABLE}")
+            rows = Product.objects.order_by("pk").values_list(
+                "pk", "product_name", "product_description"
+            )
+            total = 0
+            batch = []
+            for row in rows.iterator(chunk_size=batch_size):
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    total += self._insert(cursor, batch)
+                    batch = []
+            total += self._insert(cursor, batch)
+        return total
+
+    def _insert(self, cursor, rows):
+        if rows:
+            cursor.executemany(
+                f"INSERT INTO {SQLITE_INDEX_TABLE} "
+                "(rowid, product_name, product_description) VALUES (%s, %s, %s)",
+                rows,
+            )
+        return len(rows)
+
+
+class BasicSearchBackend:
+    """
+    Unranked `icontains` matching for databases without a full-text backend.
+
+    Every term must appear in the name or description; all hits share one
+    rank, so pages run newest product first. There is no index to keep.
+    """
+
+    RANK = 1.0
+
+    def search(self, query, limit, after=None):
+        terms = re.findall(r"\w+", query)
+        if not terms:
+            return []
+        products = Product.objects.all()
+        for term in terms:
+            products = products.filter(
+                Q(product_name__icontains=term) | Q(product_description__icontains=term)
+            )
+        if after is not None:
+            if after[0] < self.RANK:
+                return []
+            if after[0] == self.RANK:
+                products = products.filter(pk__lt=after[1])
+        pks = products.order_by("-pk").values_list("pk", flat=True)[:limit]
+        return [SearchHit(pk, self.RANK, "") for pk in pks]
+
+    def index_products(self, product_ids):
+        pass
+
+    def remove_products(self, product_ids):
+        pass
+
+    def rebuild(self):
+        return Product.objects.count()
+
+
+def get_backend():
+    if connection.vendor == "postgresql":
+        return PostgresSearchBackend()
+    if connection.vendor == "sqlite":
+        return SQLiteSearchBackend()
+    return BasicSearchBackend()
+
+
+def search(query, limit, after=None):
+    """Return up to `limit` hits ordered by (rank, pk) descending."""
+    return get_backend().search(query, limit, after)
+
+
+def index_products(product_ids):
+    get_backend().index_products(product_ids)
+
+
+def remove_products(product_ids):
+    get_backend().remove_products(product_ids)
+
+
+def rebuild():
+    return get_backend().rebuild()
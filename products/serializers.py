@@ -1,15 +1,20 @@
-from django.db import models
+from django.db import models, transaction
 from rest_framework import serializers
 
 from category.models import Category
-from products.models import Product, ProductImage, ProductInventory
-from utils.upload_files import upload_file
+from products import search
+from products.importer import FORMATS, detect_format
+from products.models import (Product, ProductImage, ProductInventory,
+                             ProductRating)
+from utils.derivatives import SizedImageMixin, apply_size, requested_size
+from utils.upload_files import UploadError, UploadPipeline
 
 
-class ProductsImageSerializer(serializers.ModelSerializer):
+class ProductsImageSerializer(SizedImageMixin, serializers.ModelSerializer):
     class Meta:
         model = ProductImage
-        fields = ["id", "image", "created_at"]
+        fields = ["id", "image", "derivatives", "created_at"]
+        read_only_fields = ["derivatives"]
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -30,6 +35,10 @@ class ProductSerializer(serializers.ModelSerializer):
     uploaded_images = serializers.ListField(
         child=serializers.URLField(),  # Change to accept URL strings
         write_only=True,
+        required=False,  # Not needed when images come in as image_files
+    )
+    image_files = serializers.ListField(
+        child=serializers.ImageField(), write_only=True, required=False
     )
 
     class Meta:
@@ -43,8 +52,24 @@ class ProductSerializer(serializers.ModelSerializer):
             "product_price",
             "images",
             "uploaded_images",
+            "image_files",
         ]
 
+    def validate(self, attrs):
+        # Upload files before create()/update() open their transaction, so
+        # it isn't held open across network calls.
+        image_files = attrs.pop("image_files", [])
+        if image_files:
+            try:
+                urls = UploadPipeline().upload_many(
+                    image_files, folder="products", resource_type="image"
+                )
+            except UploadError as error:
+                raise serializers.ValidationError({"image_files": str(error)})
+            attrs["uploaded_images"] = attrs.get("uploaded_images", []) + urls
+        return attrs
+
+    @transaction.atomic
     def create(self, validated_data):
         product_categories = validated_data.pop("product_categories", [])
         uploaded_images = validated_data.pop("uploaded_images", [])
@@ -57,8 +82,10 @@ class ProductSerializer(serializers.ModelSerializer):
         for image in uploaded_images:
             ProductImage.objects.create(product=product, image=image)
 
+        search.index_products([product.pk])
         return product
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         product_categories = validated_data.pop("product_categories", [])
         uploaded_images = validated_data.pop("uploaded_images", [])
@@ -74,17 +101,19 @@ class ProductSerializer(serializers.ModelSerializer):
             for image in uploaded_images:
                 ProductImage.objects.create(product=instance, image=image)
 
+        search.index_products([instance.pk])
         return instance
 
 
-class ImageGetSerializer(serializers.ModelSerializer):
+class ImageGetSerializer(SizedImageMixin, serializers.ModelSerializer):
     class Meta:
         model = ProductImage
-        fields = ["id", "image", "created_at"]
+        fields = ["id", "image", "derivatives", "created_at"]
 
 
 class GetProductSerializer(serializers.ModelSerializer):
     total_quantity = serializers.SerializerMethodField()
+    rating = serializers.SerializerMethodField()
     product_categories = CategorySerializer(many=True)
     images = ImageGetSerializer(many=True)
     product_primary_image = ImageGetSerializer()
@@ -100,14 +129,90 @@ class GetProductSerializer(serializers.ModelSerializer):
             "product_primary_image",
             "images",
             "total_quantity",
+            "rating",
         ]
 
     def get_total_quantity(self, obj):
+        if hasattr(obj, "stock_quantity"):
+            return obj.stock_quantity
         total_quantity = ProductInventory.objects.filter(product=obj).aggregate(
             total=models.Sum("quantity")
         )["total"]
         return total_quantity or 0
 
+    def get_rating(self, obj):
+        try:
+            rating = obj.rating
+        except ProductRating.DoesNotExist:
+            rating = ProductRating()
+        return {
+            "count": rating.count,
+            "average": rating.average,
+            "histogram": rating.histogram,
+        }
+
+
+class ProductCatalogSerializer(serializers.BaseSerializer):
+    """Renders a ProductCatalogEntry in the same shape as GetProductSerializer."""
+
+    def to_representation(self, instance):
+        data = {**instance.payload, "total_quantity": instance.total_quantity}
+        size = requested_size(self.context)
+        if size:
+            # Copies, so the entry's cached payload isn't changed in place
+            if data["product_primary_image"]:
+                data["product_primary_image"] = apply_size(
+                    dict(data["product_primary_image"]), size
+                )
+            data["images"] = [apply_size(dict(image), size) for image in data["images"]]
+        return data
+
+
+class ProductSearchResultSerializer(GetProductSerializer):
+    rank = serializers.FloatField(read_only=True)
+    highlight = serializers.CharField(read_only=True)
+
+    class Meta(GetProductSerializer.Meta):
+        fields = GetProductSerializer.Meta.fields + ["rank", "highlight"]
+
+
+class ProductImportRowSerializer(serializers.Serializer):
+    product_name = serializers.CharField(max_length=200)
+    product_description = serializers.CharField()
+    product_price = serializers.IntegerField()
+    categories = serializers.ListField(
+        child=serializers.IntegerField(), required=False, default=list
+    )
+    images = serializers.ListField(
+        child=serializers.URLField(), required=False, default=list
+    )
+    quantity = serializers.IntegerField(
+        min_value=0, required=False, allow_null=True, default=None
+    )
+
+    def validate_categories(self, value):
+        # Checked against ids loaded once per import, not one query per row.
+        unknown = set(value) - self.context["category_ids"]
+        if unknown:
+            raise serializers.ValidationError(
+                f"Unknown category ids: {sorted(unknown)}"
+            )
+        return sorted(set(value))
+
+
+class ProductImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    format = serializers.ChoiceField(choices=FORMATS, required=False)
+
+    def validate(self, data):
+        fmt = data.get("format") or detect_format(data["file"].name)
+        if fmt is None:
+            raise serializers.ValidationError(
+                {"format": "Could not tell the format from the file name."}
+            )
+        data["format"] = fmt
+        return data
+
 
 class ProductInventorySerializer(serializers.ModelSerializer):
     product = ProductSerializer()
@@ -123,3 +228,10 @@ class InventorySerializerPost(serializers.ModelSerializer):
     class Meta:
         model = ProductInventory
         fields = "__all__"
+
+
+class InventoryAdjustmentSerializer(serializers.Serializer):
+    # Plain integers: products are checked in one query by the view rather
+    # than one PrimaryKeyRelatedField lookup per line.
+    product = serializers.IntegerField()
+    delta = serializers.IntegerField()
@@ -0,0 +1,75 @@
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from category.models import Category
+from products import catalog, search
+from products.models import Product, ProductImage, ProductInventory
+from utils import derivatives
+
+
+@receiver(post_save, sender=Product)
+def refresh_saved_product(sender, instance, **kwargs):
+    catalog.schedule_refresh([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def remove_deleted_product(sender, instance, **kwargs):
+    search.remove_products([instance.pk])
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def refresh_product_images(sender, instance, **kwargs):
+    catalog.schedule_refresh([instance.product_id])
+
+
+@receiver(post_save, sender=ProductImage)
+def generate_product_image_derivatives(sender, instance, created, **kwargs):
+    if created:
+        derivatives.schedule(instance)
+
+
+@receiver(derivatives.derivatives_generated, sender=ProductImage)
+def refresh_product_image_derivatives(sender, pks, **kwargs):
+    catalog.refresh_products(
+        ProductImage.objects.filter(pk__in=pks).values_list("product_id", flat=True)
+    )
+
+
+@receiver(post_save, sender=ProductInventory)
+@receiver(post_delete, sender=ProductInventory)
+def refresh_product_stock(sender, instance, **kwargs):
+    product_id = instance.product_id
+    transaction.on_commit(lambda: catalog.refresh_stock([product_id]))
+
+
+@receiver(m2m_changed, sender=Product.product_categories.through)
+def refresh_product_categories(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            catalog.schedule_refresh([instance.pk])
+    elif action in ("post_add", "post_remove"):
+        catalog.schedule_refresh(pk_set)
+    elif action == "pre_clear":
+        # pk_set is empty on clear; remember the products before the rows go.
+        instance._cleared_product_ids = list(
+            instance.products.values_list("pk", flat=True)
+        )
+    elif action == "post_clear":
+        catalog.schedule_refresh(getattr(instance, "_cleared_product_ids", []))
+
+
+@receiver(post_save, sender=Category)
+def refresh_category_products(sender, instance, created, **kwargs):
+    # Category names are copied into every payload that lists them.
+    if not created:
+        catalog.schedule_refresh(instance.products.values_list("pk", flat=True))
+
+
+@receiver(pre_delete, sender=Category)
+def refresh_deleted_category_products(sender, instance, **kwargs):
+    # The cascade drops the category's product rows without m2m_changed, so
+    # its products are collected while the rows still exist.
+    catalog.schedule_refresh(list(instance.products.values_list("pk", flat=True)))
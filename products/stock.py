@@ -0,0 +1,156 @@
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.functions import Now
+from django.dispatch import Signal
+
+from products import catalog, ledger
+from products.models import ProductInventory
+
+# Sent with (sender=ProductInventory, product_ids=[...]) after commit when
+# products sell out or come back into stock.
+stock_status_changed = Signal()
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product_ids):
+        self.product_ids = sorted(product_ids)
+        super().__init__(f"Insufficient stock for products {self.product_ids}")
+
+
+@transaction.atomic
+def reserve(product_id, quantity, reference="", reason=ledger.Reason.CART_RESERVE):
+    """
+    Take `quantity` units of a product out of stock.
+
+    Conditional UPDATEs do the check and the decrement together, so
+    concurrent reservations can never oversell: when the row can't cover
+    the request (or the product has no inventory) no row matches and
+    False is returned. The common case, leaving stock behind, is one
+    statement; taking the last units is matched separately so selling out
+    can be announced without reading the row.
+    """
+    inventory = ProductInventory.objects.filter(product_id=product_id)
+    change = {"quantity": F("quantity") - quantity, "updated_at": Now()}
+    while True:
+        if inventory.filter(quantity__gt=quantity).update(**change):
+            sold_out = False
+            break
+        if inventory.filter(quantity=quantity).update(**change):
+            sold_out = True
+            break
+        # Neither matched: short of stock, unless a concurrent change moved
+        # the quantity between the two statements.
+        if not inventory.filter(quantity__gte=quantity).exists():
+            return False
+
+    ledger.record({product_id: -quantity}, reason, reference)
+    _stock_changed([product_id], [product_id] if sold_out else [])
+    return True
+
+
+@transaction.atomic
+def release(product_id, quantity, reference="", reason=ledger.Reason.CART_RELEASE):
+    """Put `quantity` reserved units of a product back into stock."""
+    inventory = ProductInventory.objects.filter(product_id=product_id)
+    change = {"quantity": F("quantity") + quantity, "updated_at": Now()}
+    while True:
+        if inventory.filter(quantity__gt=0).update(**change):
+            back_in_stock = False
+            break
+        if inventory.filter(quantity=0).update(**change):
+            back_in_stock = True
+            break
+        if not inventory.exists():
+            return False
+
+    ledger.record({product_id: quantity}, reason, reference)
+    _stock_changed([product_id], [product_id] if back_in_stock else [])
+    return True
+
+
+def adjust_many(deltas, reason=ledger.Reason.ADJUSTMENT, reference=""):
+    """
+    Apply {product_id: delta} to inventory atomically.
+
+    Runs a fixed number of statements whatever the batch size: one upsert
+    so every product has an inventory row, one conditional UPDATE adding
+    each delta, one SELECT for the results and one ledger INSERT. If any quantity would go
+    below zero nothing is applied and InsufficientStock is raised.
+
+    Returns {product_id: new quantity}.
+    """
+    deltas = {product_id: delta for product_id, delta in deltas.items() if delta}
+    if not deltas:
+        return {}
+
+    try:
+        with transaction.atomic():
+            quantities = _apply(deltas)
+            ledger.record(deltas, reason, reference)
+    except InsufficientStock:
+        # Rolled back; read the unchanged rows to say which were short.
+        current = dict(
+            ProductInventory.objects.filter(product_id__in=deltas).values_list(
+                "product_id", "quantity"
+            )
+        )
+        raise InsufficientStock(
+            product_id
+            for product_id, delta in deltas.items()
+            if current.get(product_id, 0) + delta < 0
+        )
+
+    _stock_changed(
+        deltas,
+        [
+            product_id
+            for product_id, delta in deltas.items()
+            if (quantities[product_id] > 0) != (quantities[product_id] - delta > 0)
+        ],
+    )
+    return quantities
+
+
+def _apply(deltas):
+    ProductInventory.objects.bulk_create(
+        [ProductInventory(product_id=product_id, quantity=0) for product_id in deltas],
+        update_conflicts=True,
+        unique_fields=["product"],
+        update_fields=["updated_at"],
+    )
+
+    # Decrements only match rows that can cover them, so a short row is
+    # left untouched instead of going negative.
+    covered = Q(product_id__in=[pid for pid, delta in deltas.items() if delta > 0])
+    for product_id, delta in deltas.items():
+        if delta < 0:
+            covered |= Q(product_id=product_id, quantity__gte=-delta)
+
+    updated = ProductInventory.objects.filter(covered).update(
+        quantity=F("quantity")
+        + Case(
+            *[When(product_id=pid, then=Value(delta)) for pid, delta in deltas.items()],
+            output_field=IntegerField(),
+        ),
+        updated_at=Now(),
+    )
+    if updated != len(deltas):
+        raise InsufficientStock([])
+
+    return dict(
+        ProductInventory.objects.filter(product_id__in=deltas).values_list(
+            "product_id", "quantity"
+        )
+    )
+
+
+def _stock_changed(product_ids, status_changed):
+    """Refresh catalog stock and announce sell-outs once the change commits."""
+    product_ids = list(product_ids)
+    transaction.on_commit(lambda: catalog.refresh_stock(product_ids))
+    if status_changed:
+        transaction.on_commit(
+            lambda: stock_status_changed.send(
+                sender=ProductInventory, product_ids=status_changed
+            )
+        )
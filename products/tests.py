@@ -1,3 +1,296 @@
-from django.test import TestCase
+import random
+import sys
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import CustomUser
+from category.models import Category
+from products import ledger, search, stock
+from products.models import (Product, ProductCatalogEntry, ProductImage,
+                             ProductInventory)
+
+
+class ProductListingQueryTests(TestCase):
+    # Three version stamps, the page and two prefetches; the first page
+    # also pays for the two facet queries.
+    PAGE_QUERIES = 6
+    FIRST_PAGE_QUERIES = PAGE_QUERIES + 2
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categories = [Category.objects.create(name=f"c{i}") for i in range(3)]
+        for i in range(60):
+            product = Product.objects.create(
+                product_name=f"p{i}", product_description="d", product_price=i
+            )
+            product.product_categories.set(cls.categories[: i % 3 + 1])
+            ProductImage.objects.create(product=product, image=f"http://x/{i}.jpg")
+            ProductInventory.objects.create(product=product, quantity=i % 4)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def get(self, url, queries):
+        with self.assertNumQueries(queries):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_first_page(self):
+        for size in (1, 10, 50, 100):
+            with self.subTest(page_size=size):
+                data = self.get(
+                    f"/api/products/?page_size={size}", self.FIRST_PAGE_QUERIES
+                )
+                self.assertEqual(len(data["results"]), min(size, 60))
+
+    def test_cursor_pages(self):
+        for size in (5, 20, 50):
+            with self.subTest(page_size=size):
+                data = self.get(
+                    f"/api/products/?page_size={size}", self.FIRST_PAGE_QUERIES
+                )
+                seen = [row["id"] for row in data["results"]]
+                while data["next"]:
+                    data = self.get(data["next"], self.PAGE_QUERIES)
+                    seen += [row["id"] for row in data["results"]]
+                self.assertEqual(len(seen), 60)
+                self.assertEqual(len(set(seen)), 60)
+
+    def test_filtered_pages(self):
+        category = self.categories[2].pk
+        url = (
+            f"/api/products/?page_size=5&category={category}"
+            "&min_price=10&max_price=50&in_stock=true"
+        )
+        data = self.get(url, self.FIRST_PAGE_QUERIES)
+        self.assertEqual(len(data["results"]), 5)
+        self.assertIn("facets", data)
+        data = self.get(data["next"], self.PAGE_QUERIES)
+        for row in data["results"]:
+            self.assertIn(category, [c["id"] for c in row["product_categories"]])
+            self.assertTrue(10 <= row["product_price"] <= 50)
+
+
+class CatalogCategoryTests(TestCase):
+    def test_deleting_category_refreshes_catalog(self):
+        kept = Category.objects.create(name="kept")
+        dropped = Category.objects.create(name="dropped")
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(
+                product_name="p", product_description="d", product_price=1
+            )
+            product.product_categories.set([kept, dropped])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            dropped.delete()
+
+        entry = ProductCatalogEntry.objects.get(pk=product.pk)
+        self.assertEqual(
+            [category["name"] for category in entry.payload["product_categories"]],
+            ["kept"],
+        )
+
+
+class ProductVersionTests(TestCase):
+    def test_deleting_category_changes_etag(self):
+        category = Category.objects.create(name="gone")
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(
+                product_name="p", product_description="d", product_price=1
+            )
+            product.product_categories.add(category)
+        client = APIClient()
+        etag = client.get("/api/products/")["ETag"]
+        self.assertEqual(
+            client.get("/api/products/", HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            category.delete()
+
+        response = client.get("/api/products/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["results"][0]["product_categories"], [])
+
+
+class BasicSearchBackendTests(TestCase):
+    def test_fallback_backend(self):
+        with mock.patch.object(connection, "vendor", "oracle"):
+            backend = search.get_backend()
+            self.assertIsInstance(backend, search.BasicSearchBackend)
+            # Product writes index through the backend and must not fail.
+            product = Product.objects.create(
+                product_name="Whey", product_description="d", product_price=1
+            )
+            backend.index_products([product.pk])
+
+    def test_terms_and_cursor(self):
+        backend = search.BasicSearchBackend()
+        matching = [
+            Product.objects.create(
+                product_name=f"Whey {i}",
+                product_description="vanilla protein",
+                product_price=1,
+            )
+            for i in range(5)
+        ]
+        Product.objects.create(
+            product_name="Whey", product_description="chocolate", product_price=1
+        )
+
+        hits = backend.search("whey vanilla", 3)
+        self.assertEqual([hit.pk for hit in hits], [p.pk for p in matching[:1:-1]])
+        rest = backend.search("whey vanilla", 3, (hits[-1].rank, hits[-1].pk))
+        self.assertEqual([hit.pk for hit in rest], [p.pk for p in matching[1::-1]])
+
+
+class ProductImportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(
+            CustomUser.objects.create_user(
+                email="staff@example.com", password="x", is_staff=True
+            )
+        )
+
+    def upload(self, name, content):
+        return self.client.post(
+            "/api/products/import/",
+            {"file": SimpleUploadedFile(name, content)},
+            format="multipart",
+        )
+
+    def test_csv_that_is_not_utf8(self):
+        content = (
+            "product_name,product_description,product_price\n"
+            "Whey,Vanilla,10\n"
+            "Caf\xe9,Latin-1,12\n"
+        ).encode("latin-1")
+        response = self.upload("products.csv", content)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["created"], 0)
+        self.assertIn("UTF-8", response.data["errors"][0]["errors"])
+
+    def test_jsonl_line_that_is_not_utf8(self):
+        row = '{"product_name": "%s", "product_description": "d", "product_price": 1}\n'
+        content = (row % "Whey").encode("utf-8") + (row % "Caf\xe9").encode("latin-1")
+        response = self.upload("products.jsonl", content)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual(response.data["errors"][0]["row"], 2)
+
+
+# Catalog stock refreshes run after commit, where a lock error on SQLite
+# would hide whether the reservation itself went through.
+@mock.patch("products.catalog.refresh_stock")
+class StockReservationStressTests(TransactionTestCase):
+    THREADS = 8
+    ATTEMPTS = 100
+    STOCK = 500
+    MAX_QUANTITY = 3
+    RELEASE_RATIO = 0.2
+    # A database that stays locked fails the test instead of hanging it.
+    RETRIES = 50
+    RETRY_DELAY = 0.01
+
+    def test_concurrent_reservations_never_oversell(self, refresh_stock):
+        product = Product.objects.create(
+            product_name="p", product_description="d", product_price=1
+        )
+        stock.adjust_many({product.pk: self.STOCK})
+        inventory = ProductInventory.objects.filter(product=product)
+
+        lock = threading.Lock()
+        totals = {"reserved": 0, "released": 0, "rejected": 0}
+        start = threading.Barrier(self.THREADS + 1)
+        done = threading.Event()
+        lowest = [self.STOCK]
+        errors = []
+
+        def retry(operation, *args):
+            for attempt in range(self.RETRIES):
+                try:
+                    return operation(*args)
+                except OperationalError:
+                    # SQLite gives up on a busy write lock; nothing changed.
+                    if attempt == self.RETRIES - 1:
+                        raise
+                    # Jittered, so waiting threads don't retry in lockstep.
+                    time.sleep(self.RETRY_DELAY * (1 + random.random()))
+
+        def worker(index):
+            rng = random.Random(index)
+            counts = dict.fromkeys(totals, 0)
+            start.wait()
+            try:
+                for _ in range(self.ATTEMPTS):
+                    quantity = rng.randint(1, self.MAX_QUANTITY)
+                    reserved = retry(stock.reserve, product.pk, quantity)
+                    if not reserved:
+                        counts["rejected"] += 1
+                        continue
+                    counts["reserved"] += quantity
+                    if rng.random() < self.RELEASE_RATIO:
+                        retry(stock.release, product.pk, quantity)
+                        counts["released"] += quantity
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+                with lock:
+                    for name, value in counts.items():
+                        totals[name] += value
+
+        def watch():
+            # Samples the row while the workers run.
+            start.wait()
+            try:
+                while not done.is_set():
+                    try:
+                        quantity = inventory.values_list("quantity", flat=True)[0]
+                        lowest[0] = min(lowest[0], quantity)
+                    except OperationalError:
+                        pass
+                    # Back off so reads don't starve the writers of the lock.
+                    time.sleep(0.001)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=worker, args=(index,))
+            for index in range(self.THREADS)
+        ]
+        watcher = threading.Thread(target=watch)
+        for thread in threads + [watcher]:
+            thread.start()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        done.set()
+        watcher.join()
+
+        operations = self.THREADS * self.ATTEMPTS
+        sys.stderr.write(
+            f"\n{connection.vendor}: {self.THREADS} threads, {operations} "
+            f"reservations in {elapsed:.2f}s ({operations / elapsed:.0f}/s), "
+            f"{totals['rejected']} out of stock\n"
+        )
+
+        self.assertEqual(errors, [])
+        final = inventory.get().quantity
+        self.assertEqual(final, self.STOCK - totals["reserved"] + totals["released"])
+        self.assertGreaterEqual(lowest[0], 0)
+        self.assertGreaterEqual(final, 0)
+        self.assertLessEqual(totals["reserved"] - totals["released"], self.STOCK)
+        self.assertEqual(ledger.stock_at(product.pk, timezone.now()), final)
+        # Enough demand that some reservations ran out of stock.
+        self.assertGreater(totals["rejected"], 0)
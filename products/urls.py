@@ -1,12 +1,19 @@
 from django.urls import path
 
-from products.views import (AddOrUpdateInventory, AddProduct, GetAllProducts,
-                            GetProductById, ProductInventoryList,
-                            ProductPrimaryImageUpdateView, UpdateProduct)
+from products.views import (AddOrUpdateInventory, AddProduct,
+                            BatchInventoryAdjustment, GetAllProducts,
+                            GetProductById, ImportProducts,
+                            ProductInventoryList,
+                            ProductPrimaryImageUpdateView, SearchProducts,
+                            TopProducts, TrendingProducts, UpdateProduct)
 
 urlpatterns = [
     path("products/create/", AddProduct.as_view(), name="create-product"),
+    path("products/import/", ImportProducts.as_view(), name="import-products"),
     path("products/", GetAllProducts.as_view(), name="get-products"),
+    path("products/search/", SearchProducts.as_view(), name="search-products"),
+    path("products/top/", TopProducts.as_view(), name="top-products"),
+    path("products/trending/", TrendingProducts.as_view(), name="trending-products"),
     path("products/<int:pk>/", GetProductById.as_view(), name="single-product"),
     path("products/update/<int:pk>/", UpdateProduct.as_view(), name="update-product"),
     path(
@@ -17,6 +24,11 @@ urlpatterns = [
         AddOrUpdateInventory.as_view(),
         name="product-inventory-update",
     ),
+    path(
+        "products/inventory/batch/",
+        BatchInventoryAdjustment.as_view(),
+        name="product-inventory-batch",
+    ),
     path(
         "products/<int:id>/set-primary-image/",
         ProductPrimaryImageUpdateView.as_view(),
@@ -1,14 +1,26 @@
+from django.conf import settings
+from django.db import transaction
 from rest_framework import generics, status
 from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from products.models import Product, ProductImage, ProductInventory
+from category.models import Category
+from products import importer, leaderboard, ledger, search, stock
+from products.filters import apply_filters, facet_counts, parse_filters
+from products.models import (Product, ProductCatalogEntry, ProductImage,
+                             ProductInventory)
 from products.serializers import (GetProductSerializer,
+                                  InventoryAdjustmentSerializer,
                                   InventorySerializerPost,
+                                  ProductCatalogSerializer,
+                                  ProductImportSerializer,
                                   ProductInventorySerializer,
+                                  ProductSearchResultSerializer,
                                   ProductSerializer)
 from utils.common import IsAdminUser
+from utils.conditional import ConditionalGetMixin
+from utils.pagination import KeysetPagination, RankedKeysetPagination
 
 
 class AddProduct(generics.CreateAPIView):
@@ -17,14 +29,158 @@ class AddProduct(generics.CreateAPIView):
     permission_classes = [IsAuthenticated, IsAdminUser]
 
 
-class GetAllProducts(generics.ListAPIView):
-    queryset = Product.objects.prefetch_related("product_categories", "images").all()
-    serializer_class = GetProductSerializer
+class CatalogReadMixin:
+    """
+    Serve reads from ProductCatalogEntry when PRODUCT_CATALOG_READS is on.
 
+    Catalog entries share the product's primary key and created_at, so
+    lookups and keyset cursors work the same against either table.
+    """
 
-class GetProductById(generics.RetrieveAPIView, generics.DestroyAPIView):
-    queryset = Product.objects.all()
-    serializer_class = GetProductSerializer
+    def reads_from_catalog(self):
+        return settings.PRODUCT_CATALOG_READS and self.request.method == "GET"
+
+    def get_queryset(self):
+        if self.reads_from_catalog():
+            return ProductCatalogEntry.objects.all()
+        return Product.objects.for_listing()
+
+    def get_serializer_class(self):
+        if self.reads_from_catalog():
+            return ProductCatalogSerializer
+        return GetProductSerializer
+
+
+class ProductVersionMixin(ConditionalGetMixin):
+    # Catalog entries are touched whenever a product's images, categories
+    # or stock change, which Product.updated_at alone would miss. Entries
+    # go with their products, so only products and categories are counted.
+    def get_version_sources(self):
+        products = Product.objects.all()
+        entries = ProductCatalogEntry.objects.all()
+        if "pk" in self.kwargs:
+            products = products.filter(pk=self.kwargs["pk"])
+            entries = entries.filter(pk=self.kwargs["pk"])
+        return [
+            (products, ["updated_at"]),
+            (entries, ["updated_at"], False),
+            # Listings embed category names and facets list categories.
+            (Category.objects.all(), ["updated_at"]),
+        ]
+
+
+class LeaderboardView(CatalogReadMixin, generics.ListAPIView):
+    board = None
+    score_field = "score"
+    default_limit = 20
+
+    def list(self, request, *args, **kwargs):
+        try:
+            limit = int(request.query_params.get("limit", self.default_limit))
+        except ValueError:
+            return Response(
+                {"limit": "Expected an integer."}, status=status.HTTP_400_BAD_REQUEST
+            )
+        limit = max(1, min(limit, settings.LEADERBOARD_SIZE))
+
+        entries = self.board.top(limit)
+        products = self.get_queryset().in_bulk(
+            [product_id for product_id, _ in entries]
+        )
+        ranked = [
+            (products[product_id], score)
+            for product_id, score in entries
+            if product_id in products
+        ]
+        data = self.get_serializer([product for product, _ in ranked], many=True).data
+        for row, (_, score) in zip(data, ranked):
+            row[self.score_field] = score
+        return Response({"results": data}, status=status.HTTP_200_OK)
+
+
+class TopProducts(LeaderboardView):
+    board = leaderboard.TOP_SELLERS
+    score_field = "units_sold"
+
+
+class TrendingProducts(LeaderboardView):
+    board = leaderboard.TRENDING
+
+
+class ImportProducts(generics.GenericAPIView):
+    serializer_class = ProductImportSerializer
+    parser_classes = [MultiPartParser]
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        upload = serializer.validated_data["file"]
+        rows = importer.read_rows(upload.file, serializer.validated_data["format"])
+        result = importer.import_products(rows)
+
+        status_code = status.HTTP_201_CREATED if result.created else status.HTTP_200_OK
+        return Response(result.as_dict(), status=status_code)
+
+
+class GetAllProducts(ProductVersionMixin, CatalogReadMixin, generics.ListAPIView):
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        filters = parse_filters(self.request.query_params)
+        if not filters:
+            return queryset
+        if queryset.model is Product:
+            return apply_filters(queryset, filters)
+        matching = apply_filters(Product.objects.all(), filters)
+        return queryset.filter(pk__in=matching.values("pk"))
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        # Facets describe the whole result set, so only the first page
+        # pays for them.
+        if not request.query_params.get(self.paginator.cursor_query_param):
+            response.data["facets"] = facet_counts(parse_filters(request.query_params))
+        return response
+
+
+class SearchProducts(generics.ListAPIView):
+    serializer_class = ProductSearchResultSerializer
+    pagination_class = RankedKeysetPagination
+
+    def list(self, request, *args, **kwargs):
+        query = request.query_params.get("q", "").strip()
+        if not query:
+            return Response(
+                {"error": "q is required"}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        hits = self.paginator.paginate_search(
+            lambda limit, after: search.search(query, limit, after), request
+        )
+        products = Product.objects.for_listing().in_bulk([hit.pk for hit in hits])
+
+        results = []
+        for hit in hits:
+            product = products.get(hit.pk)
+            if product is None:
+                continue
+            product.rank = hit.rank
+            product.highlight = hit.highlight
+            results.append(product)
+
+        serializer = self.get_serializer(results, many=True)
+        return self.paginator.get_paginated_response(serializer.data)
+
+
+class GetProductById(
+    ProductVersionMixin,
+    CatalogReadMixin,
+    generics.RetrieveAPIView,
+    generics.DestroyAPIView,
+):
 
     def get_permissions(self):
         if self.request.method == "GET":
@@ -60,16 +216,18 @@ class AddOrUpdateInventory(generics.GenericAPIView):
             product_id = serializer.validated_data["product"]
             quantity = serializer.validated_data["quantity"]
 
-            # Attempt to get an existing inventory item or create a new one
-            inventory_item, created = ProductInventory.objects.get_or_create(
-                product_id=product_id.id,
-                defaults={"quantity": quantity},  # Default quantity if new
-            )
+            # Add the quantity in the database rather than in Python, creating
+            # the inventory row if needed, and record it in the stock ledger
+            with transaction.atomic():
+                created = not ProductInventory.objects.filter(
+                    product_id=product_id.id
+                ).exists()
+                stock.adjust_many(
+                    {product_id.id: quantity}, reason=ledger.Reason.RESTOCK
+                )
+                inventory_item = ProductInventory.objects.get(product_id=product_id.id)
 
             if not created:
-                # If the item existed, update the quantity
-                inventory_item.quantity += quantity
-                inventory_item.save()
                 status_message = "Inventory updated"
                 status_code = status.HTTP_200_OK
             else:
@@ -88,6 +246,51 @@ class AddOrUpdateInventory(generics.GenericAPIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class BatchInventoryAdjustment(generics.GenericAPIView):
+    serializer_class = InventoryAdjustmentSerializer
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    max_batch_size = 1000
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(
+            data=request.data,
+            many=True,
+            allow_empty=False,
+            max_length=self.max_batch_size,
+        )
+        serializer.is_valid(raise_exception=True)
+
+        deltas = {}
+        for line in serializer.validated_data:
+            deltas[line["product"]] = deltas.get(line["product"], 0) + line["delta"]
+
+        known = set(Product.objects.filter(pk__in=deltas).values_list("pk", flat=True))
+        unknown = sorted(set(deltas) - known)
+        if unknown:
+            return Response(
+                {"error": "Products not found", "products": unknown},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            quantities = stock.adjust_many(deltas)
+        except stock.InsufficientStock as error:
+            return Response(
+                {"error": "Insufficient stock", "products": error.product_ids},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        return Response(
+            {
+                "inventory": [
+                    {"product": product_id, "quantity": quantities[product_id]}
+                    for product_id in sorted(quantities)
+                ]
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
 class ProductPrimaryImageUpdateView(generics.UpdateAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS
+
+# Backends every process reaches the same copy of, and that keep entries
+# until they expire instead of culling them to make room.
+SHARED_CACHE_BACKENDS = (
+    "django.core.cache.backends.redis.RedisCache",
+    "django.core.cache.backends.memcached.PyMemcacheCache",
+    "django.core.cache.backends.memcached.PyLibMCCache",
+    "django.core.cache.backends.db.DatabaseCache",
+    "django_redis.cache.RedisCache",
+)
+
+
+def cache_backend(alias=DEFAULT_CACHE_ALIAS):
+    return settings.CACHES[alias]["BACKEND"]
+
+
+def is_shared(alias=DEFAULT_CACHE_ALIAS):
+    """Whether every process sees the same entries in the cache."""
+    return cache_backend(alias) in SHARED_CACHE_BACKENDS
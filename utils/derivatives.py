@@ -0,0 +1,182 @@
+import io
+import logging
+import os
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.dispatch import Signal
+from PIL import Image, ImageOps
+
+from utils.upload_files import UploadPipeline
+
+logger = logging.getLogger(__name__)
+
+# Sent with (sender=model, pks=[...]) once renditions for those instances
+# are stored.
+derivatives_generated = Signal()
+
+_EXTENSIONS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp"}
+
+_executor = None
+
+
+def render(content):
+    """{rendition name: encoded bytes} for each IMAGE_DERIVATIVES entry."""
+    with Image.open(io.BytesIO(content)) as source:
+        source = ImageOps.exif_transpose(source)
+        renditions = {}
+        for name, spec in settings.IMAGE_DERIVATIVES.items():
+            image = source.copy()
+            image.thumbnail(spec["size"], Image.Resampling.LANCZOS)
+            if spec["format"] == "JPEG" and image.mode != "RGB":
+                image = image.convert("RGB")
+            buffer = io.BytesIO()
+            image.save(buffer, format=spec["format"], quality=spec.get("quality", 80))
+            renditions[name] = buffer.getvalue()
+        return renditions
+
+
+def generate(content, pipeline=None):
+    """Render and upload every rendition; returns {rendition name: URL}."""
+    renditions = render(content)
+    files = [
+        ContentFile(data, name=f"{name}.{_EXTENSIONS[spec['format']]}")
+        for (name, data), spec in zip(
+            renditions.items(), settings.IMAGE_DERIVATIVES.values()
+        )
+    ]
+    pipeline = pipeline or UploadPipeline()
+    urls = pipeline.upload_many(files, folder="derivatives", resource_type="image")
+    return dict(zip(renditions, urls))
+
+
+def read_source(value):
+    """Bytes of an image given as a URL (ProductImage) or a FieldFile (Post)."""
+    if isinstance(value, str):
+        if value.startswith(settings.MEDIA_URL):
+            # Stored by the local upload backend
+            path = os.path.join(
+                settings.UPLOAD_LOCAL_ROOT, value[len(settings.MEDIA_URL) :]
+            )
+            with open(path, "rb") as handle:
+                return handle.read()
+        with urllib.request.urlopen(value, timeout=settings.UPLOAD_TIMEOUT) as response:
+            return response.read()
+    with value.open("rb") as handle:
+        return handle.read()
+
+
+def derive(instance, field="image", pipeline=None):
+    return generate(read_source(getattr(instance, field)), pipeline)
+
+
+def schedule(instance, field="image"):
+    """
+    Generate renditions for `instance` on the background pool once the
+    current transaction commits, so requests never wait on Pillow.
+    """
+    model, pk = type(instance), instance.pk
+    transaction.on_commit(lambda: _get_executor().submit(_run, model, pk, field))
+
+
+def backfill(queryset, field="image", batch_size=100, stdout=None):
+    """
+    Generate renditions for every instance in `queryset`, `batch_size` at a
+    time: images in a batch are processed on the worker pool and their URLs
+    written back with one bulk_update.
+    """
+    total = 0
+    pipeline = UploadPipeline()
+    queryset = queryset.order_by("pk")
+    last_pk = None
+    while True:
+        batch = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        batch = list(batch[:batch_size])
+        if not batch:
+            return total
+        last_pk = batch[-1].pk
+
+        with ThreadPoolExecutor(settings.IMAGE_DERIVATIVE_WORKERS) as executor:
+            results = executor.map(
+                lambda instance: _derive_or_log(instance, field, pipeline), batch
+            )
+            done = []
+            for instance, derivatives in zip(batch, results):
+                if derivatives is not None:
+                    instance.derivatives = derivatives
+                    done.append(instance)
+
+        model = type(batch[0])
+        model.objects.bulk_update(done, ["derivatives"])
+        derivatives_generated.send(sender=model, pks=[instance.pk for instance in done])
+        total += len(done)
+        if stdout is not None:
+            stdout.write(f"Generated renditions for {total} images")
+
+
+class SizedImageMixin:
+    """
+    Serializer mixin for models with a `derivatives` field: with
+    ?size=<rendition> the image field is swapped for that rendition's URL.
+    Unknown sizes, and images whose renditions aren't ready yet, keep the
+    original.
+    """
+
+    image_field = "image"
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        return apply_size(data, requested_size(self.context), self.image_field)
+
+
+def requested_size(context):
+    request = context.get("request")
+    if request is None:
+        return None
+    return request.query_params.get("size")
+
+
+def apply_size(data, size, field="image"):
+    if size and data and data.get("derivatives") and size in data["derivatives"]:
+        data[field] = data["derivatives"][size]
+    return data
+
+
+def _derive_or_log(instance, field, pipeline):
+    try:
+        return derive(instance, field, pipeline)
+    except Exception:
+        logger.exception(
+            "Could not generate renditions for %s %s",
+            instance._meta.label,
+            instance.pk,
+        )
+        return None
+
+
+def _run(model, pk, field):
+    try:
+        instance = model.objects.filter(pk=pk).first()
+        if instance is None or not getattr(instance, field):
+            return
+        derivatives = _derive_or_log(instance, field, None)
+        if derivatives is None:
+            return
+        model.objects.filter(pk=pk).update(derivatives=derivatives)
+        derivatives_generated.send(sender=model, pks=[pk])
+    finally:
+        # Pool threads outlive the request cycle that would close this.
+        connection.close()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_DERIVATIVE_WORKERS,
+            thread_name_prefix="derivatives",
+        )
+    return _executor
@@ -0,0 +1,154 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only cursor pagination on a composite key.
+
+    Unlike DRF's CursorPagination, which only seeks on the first ordering
+    field and falls back to an offset for ties, every field in `ordering`
+    is part of the seek predicate, so each page is a single index range
+    scan no matter how deep the client pages.
+    """
+
+    ordering = ("-created_at", "-pk")
+    page_size = 20
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        ordering = self.get_ordering(view)
+        self.fields = [field.lstrip("-") for field in ordering]
+
+        position = self.decode_cursor(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self.seek_filter(ordering, position))
+
+        results = list(queryset.order_by(*ordering)[: self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict([("next", self.get_next_link()), ("results", data)])
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_ordering(self, view):
+        return getattr(view, "keyset_ordering", self.ordering)
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        position = [self.encode_value(getattr(last, field)) for field in self.fields]
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(position)
+        )
+
+    def seek_filter(self, ordering, position):
+        # (a, b) < (x, y)  ==  a < x OR (a = x AND b < y), and so on for
+        # longer keys. Each field keeps its own sort direction.
+        predicate = Q()
+        for index, field in enumerate(ordering):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            term = Q(**{f"{name}__{lookup}": position[index]})
+            for previous, value in zip(self.fields[:index], position[:index]):
+                term &= Q(**{previous: value})
+            predicate |= term
+        return predicate
+
+    @staticmethod
+    def encode_value(value):
+        if hasattr(value, "isoformat"):
+            return value.isoformat()
+        return value
+
+    @staticmethod
+    def encode_cursor(position):
+        raw = json.dumps(position, separators=(",", ":")).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii")
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+            if not isinstance(position, list) or len(position) != len(self.fields):
+                raise ValueError
+            return [
+                self.to_python(model, field, value)
+                for field, value in zip(self.fields, position)
+            ]
+        except (TypeError, ValueError, UnicodeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def to_python(model, name, value):
+        if model is None:
+            return value
+        if name == "pk":
+            return model._meta.pk.to_python(value)
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # Annotations (e.g. a search rank) have no model field.
+            return value
+        return field.to_python(value)
+
+
+class RankedKeysetPagination(KeysetPagination):
+    """
+    Keyset pagination over a ranked search instead of a queryset.
+
+    `search(limit, after)` must return objects exposing `rank` and `pk`,
+    ordered by both descending, strictly after the `(rank, pk)` position.
+    """
+
+    ordering = ("-rank", "-pk")
+
+    def paginate_search(self, search, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.fields = [field.lstrip("-") for field in self.ordering]
+
+        position = self.decode_cursor(request, None)
+        results = list(search(self.page_size + 1, position))
+        self.has_next = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        return self.page
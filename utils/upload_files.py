@@ -1,42 +1,218 @@
+import hashlib
+import logging
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from functools import cache
+
 import cloudinary
-import cloudinary.api
 import cloudinary.uploader
-import environ
+from django.conf import settings
+from django.core.cache import cache as shared_cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class UploadError(Exception):
+    pass
+
+
+class CloudinaryBackend:
+    name = "cloudinary"
+
+    def __init__(self):
+        _configure_cloudinary()
+
+    def upload(self, content, filename, folder, resource_type, timeout):
+        result = cloudinary.uploader.upload(
+            content,
+            folder=folder,
+            resource_type=resource_type,
+            public_id=os.path.splitext(filename)[0],
+            overwrite=False,
+            timeout=timeout,
+        )
+        return result["secure_url"]
+
+
+class LocalBackend:
+    """
+    Writes uploads under UPLOAD_LOCAL_ROOT (MEDIA_ROOT by default) and returns
+    their MEDIA_URL address. A stand-in for Cloudinary in development, tests
+    and offline benchmarks.
+    """
+
+    name = "local"
+
+    def __init__(self, location=None, base_url=None):
+        self.storage = FileSystemStorage(
+            location=location or settings.UPLOAD_LOCAL_ROOT,
+            base_url=base_url or settings.MEDIA_URL,
+        )
+
+    def upload(self, content, filename, folder, resource_type, timeout):
+        name = os.path.join(folder, filename)
+        if not self.storage.exists(name):
+            name = self.storage.save(name, ContentFile(content))
+        return self.storage.url(name)
+
+
+BACKENDS = {
+    "cloudinary": CloudinaryBackend,
+    "local": LocalBackend,
+}
+
 
-env = environ.Env()
-environ.Env.read_env()
+def get_backend(name=None):
+    """UPLOAD_BACKEND is "cloudinary", "local" or a dotted path to a class."""
+    name = name or settings.UPLOAD_BACKEND
+    backend_class = BACKENDS.get(name) or import_string(name)
+    return backend_class()
 
-cloudinary.config(
-    cloud_name=env("CLOUDINARY_CLOUD_NAME"),
-    api_key=env("CLOUDINARY_API_KEY"),
-    api_secret=env("CLOUDINARY_API_SECRET"),
-)
+
+class UploadPipeline:
+    """
+    Upload many files in parallel on a bounded thread pool.
+
+    Files are hashed first: identical content in one batch is uploaded
+    once, and content uploaded before is answered from the cache without
+    touching the backend. Each upload is retried with exponential backoff
+    and the batch fails with UploadError if any file can't be stored.
+    """
+
+    def __init__(self, backend=None, max_workers=None, timeout=None, retries=None):
+        self.backend = backend or get_backend()
+        self.max_workers = max_workers or settings.UPLOAD_MAX_WORKERS
+        self.timeout = timeout or settings.UPLOAD_TIMEOUT
+        self.retries = settings.UPLOAD_RETRIES if retries is None else retries
+
+    def upload_many(self, files, folder="common", resource_type="auto"):
+        """Upload paths, bytes or file objects; returns URLs in the same order."""
+        items = [_read(file) for file in files]
+        digests = [hashlib.sha256(content).hexdigest() for content, _ in items]
+        keys = {digest: self.cache_key(digest, folder) for digest in digests}
+        urls = shared_cache.get_many(list(keys.values()))
+
+        pending = {}
+        for digest, (content, filename) in zip(digests, items):
+            if keys[digest] not in urls and digest not in pending:
+                pending[digest] = (content, _stored_name(digest, filename))
+
+        if pending:
+            logger.info(
+                "Uploading %d of %d files to %s",
+                len(pending),
+                len(items),
+                self.backend.name,
+            )
+            uploaded = self._upload(pending, folder, resource_type)
+            shared_cache.set_many(
+                {keys[digest]: url for digest, url in uploaded.items()}, timeout=None
+            )
+            urls.update({keys[digest]: url for digest, url in uploaded.items()})
+
+        return [urls[keys[digest]] for digest in digests]
+
+    def upload(self, file, folder="common", resource_type="auto"):
+        return self.upload_many([file], folder, resource_type)[0]
+
+    def cache_key(self, digest, folder):
+        return f"upload:{self.backend.name}:{folder}:{digest}"
+
+    def _upload(self, pending, folder, resource_type):
+        workers = min(self.max_workers, len(pending))
+        executor = ThreadPoolExecutor(max_workers=workers)
+        try:
+            futures = {
+                digest: executor.submit(
+                    self._upload_one, content, filename, folder, resource_type
+                )
+                for digest, (content, filename) in pending.items()
+            }
+            # Enough time for every file to use all of its attempts, queued
+            # behind the others on the pool.
+            rounds = math.ceil(len(pending) / workers)
+            deadline = time.monotonic() + rounds * self._attempts_budget()
+            results = {}
+            for digest, future in futures.items():
+                remaining = max(deadline - time.monotonic(), 0)
+                try:
+                    results[digest] = future.result(timeout=remaining)
+                except FutureTimeoutError:
+                    raise UploadError(f"Upload of {pending[digest][1]} timed out.")
+            return results
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _attempts_budget(self):
+        backoff = sum(self._backoff(attempt) for attempt in range(self.retries))
+        return self.timeout * (self.retries + 1) + backoff
+
+    def _backoff(self, attempt):
+        return 0.5 * 2**attempt
+
+    def _upload_one(self, content, filename, folder, resource_type):
+        for attempt in range(self.retries + 1):
+            try:
+                return self.backend.upload(
+                    content, filename, folder, resource_type, self.timeout
+                )
+            except Exception as error:
+                if attempt == self.retries:
+                    logger.error("Upload of %s failed: %s", filename, error)
+                    raise UploadError(f"Upload of {filename} failed: {error}")
+                delay = self._backoff(attempt)
+                logger.warning(
+                    "Upload of %s failed (%s), retrying in %.1fs",
+                    filename,
+                    error,
+                    delay,
+                )
+                time.sleep(delay)
 
 
 def upload_file(file_path, folder="common", resource_type="auto"):
     """
-    Upload a file to Cloudinary.
+    Upload a file with the configured backend.
 
     Args:
         file_path (str): The path to the file to upload.
-        folder (str): The Cloudinary folder where the file will be stored.
+        folder (str): The folder where the file will be stored.
         resource_type (str): The type of file ('image', 'video', or 'auto').
 
     Returns:
         str: The URL of the uploaded file.
     """
-    try:
-        result = cloudinary.uploader.upload(
-            file_path, folder=folder, resource_type=resource_type
-        )
-        print(f"File uploaded successfully: {result['secure_url']}")
-        return result["secure_url"]
-    except Exception as e:
-        print(f"Error uploading file: {e}")
-        raise
+    return UploadPipeline().upload(file_path, folder, resource_type)
+
+
+@cache
+def _configure_cloudinary():
+    cloudinary.config(
+        cloud_name=settings.CLOUDINARY_CLOUD_NAME,
+        api_key=settings.CLOUDINARY_API_KEY,
+        api_secret=settings.CLOUDINARY_API_SECRET,
+    )
+
+
+def _read(file):
+    """(content, filename) for a path, raw bytes or a file object."""
+    if isinstance(file, bytes):
+        return file, ""
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "rb") as handle:
+            return handle.read(), os.path.basename(file)
+    if hasattr(file, "seek"):
+        file.seek(0)
+    content = file.read()
+    return content, os.path.basename(getattr(file, "name", "") or "")
 
 
-# Example Usage
-if __name__ == "__main__":
-    file_path = "path/to/your/file.jpg"  # Replace with the path to your file
-    upload_file(file_path)
+def _stored_name(digest, filename):
+    # Naming files by content keeps re-uploads idempotent on the backend too.
+    return digest + os.path.splitext(filename)[1].lower()